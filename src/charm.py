@@ -4,53 +4,109 @@
 
 """Charm the application."""
 import base64
+import dataclasses
+import functools
 import logging
+import os
+import time
 
-import kubernetes.client
 import ops
-from botocore.exceptions import ClientError
-from charmlibs.interfaces.otlp import OtlpRequirer
+from charmlibs.interfaces.otlp import OtlpRequirer, RuleStore
 from charms.data_platform_libs.v0.data_models import TypedCharmBase
 from charms.data_platform_libs.v0.database_requires import DatabaseRequires
 from charms.data_platform_libs.v0.s3 import S3Requirer
 from charms.grafana_k8s.v0.grafana_dashboard import GrafanaDashboardProvider
 from charms.loki_k8s.v1.loki_push_api import LogForwarder
 from charms.traefik_k8s.v2.ingress import IngressPerAppRequirer
-from kubernetes.client.exceptions import ApiException
+from cosl import JujuTopology
 from ops.model import ActiveStatus, BlockedStatus, MaintenanceStatus, WaitingStatus
 from ops.pebble import CheckStatus
 
-from charm_helpers import create_env
+from charm_helpers import (
+    create_env,
+    get_database_connection_budget,
+    get_temporal_worker_ports,
+    get_worker_concurrency,
+)
+from charm_metrics import CharmMetrics
 from connections import ReconcileData
+from job_history import purge_job_history
+from k8s_helpers import (
+    apply_daemonset,
+    apply_service,
+    build_prepull_daemonset,
+    build_server_service,
+    delete_daemonset,
+    delete_service,
+    parse_key_value_pairs,
+    parse_tolerations,
+    set_server_ready_label,
+)
 from literals import (
     AIRBYTE_API_PORT,
     AIRBYTE_AUTH_K8S_SECRET_NAME,
     AIRBYTE_VERSION,
+    BASE_ENV,
+    BOOTLOADER_COMPLETED_NOTICE,
     BUCKET_CONFIGS,
     CONNECTOR_BUILDER_SERVER_API_PORT,
+    CONNECTOR_REGISTRY_FETCH_RETRY_INTERVAL,
+    CONNECTOR_REGISTRY_MIRROR_CONTAINER,
+    CONNECTOR_REGISTRY_MIRROR_DIR,
+    CONNECTOR_REGISTRY_MIRROR_PORT,
+    CONNECTOR_REGISTRY_MIRROR_SERVICE,
     CONTAINER_HEALTH_CHECK_MAP,
+    DB_NAME,
+    DRAIN_CONTAINERS,
+    DRAINED_KEY,
+    IMAGE_PREPULL_BASE_ENV_KEYS,
+    IMAGE_PREPULL_CONFIGS,
+    IMAGE_PREPULL_NAMESPACE_KEY,
     INTERNAL_API_PORT,
+    JOB_HISTORY_PURGE_MAX_BATCHES,
+    LOG4J2_JOB_LOGS_PATH,
+    LOG4J2_JOB_LOGS_SOURCE,
+    LOG4J2_OVERLAY_PATH,
     LOGS_BUCKET_CONFIG,
+    LOKI_ALERT_RULES_PATH,
+    MIGRATED_VERSION_KEY,
+    PEBBLE_PATH,
+    PROMETHEUS_ALERT_RULES_PATH,
+    RESERVED_PORTS,
+    SERVER_SERVICE_KEY,
+    SERVER_SERVICE_PORTS,
+    STARTUP_STAGES,
+    TERMINATION_GRACE_PERIOD_DEFAULT,
+    TERMINATION_GRACE_PERIOD_MARGIN,
     WORKLOAD_API_PORT,
     WORKLOAD_LAUNCHER_PORT,
 )
 from log import log_event_handler
+from log4j_helpers import build_log4j2_overlay
+from registry_mirror import (
+    count_connectors,
+    fetch_registry,
+    is_registry_mirrored,
+    push_registry,
+)
 from relations.airbyte_ui import AirbyteServerProvider
 from relations.minio import MinioRelation
 from relations.postgresql import PostgresqlRelation
+from relations.rolling_restart import RollingRestart
 from relations.s3 import S3Integrator
-from s3_helpers import S3Client
 from structured_config import CharmConfig, StorageType
 
 logger = logging.getLogger(__name__)
 
 
-def get_pebble_layer(application_name, context):
+def get_pebble_layer(application_name, context, registry_mirror=False, kill_delay=None):
     """Create pebble layer based on application.
 
     Args:
         application_name: Name of Airbyte application.
         context: environment to include with the pebble plan.
+        registry_mirror: whether to also serve the connector registry mirror.
+        kill_delay: seconds the service is given to stop after SIGTERM, or None for the default.
 
     Returns:
         pebble plan dict.
@@ -70,9 +126,30 @@ def get_pebble_layer(application_name, context):
         },
     }
 
+    if kill_delay is not None:
+        pebble_layer["services"][application_name]["kill-delay"] = f"{kill_delay}s"
+
+    if registry_mirror:
+        pebble_layer["services"][CONNECTOR_REGISTRY_MIRROR_SERVICE] = {
+            "summary": "connector registry mirror",
+            "command": (
+                f"/usr/bin/python3.10 -m http.server {CONNECTOR_REGISTRY_MIRROR_PORT}"
+                f" --bind 127.0.0.1 --directory {CONNECTOR_REGISTRY_MIRROR_DIR}"
+            ),
+            "startup": "enabled",
+            "override": "replace",
+        }
+
     if application_name == "airbyte-bootloader":
         pebble_layer["services"][application_name].update(
             {
+                # Notify the charm as soon as the bootloader has succeeded, so that it
+                # configures the runtime services without waiting for update-status.
+                # A failed notice must not fail the bootloader, which would rerun it.
+                "command": (
+                    f"/bin/bash -c '/bin/bash {application_name}/airbyte-app/bin/{application_name}"
+                    f" && ({PEBBLE_PATH} notify {BOOTLOADER_COMPLETED_NOTICE} || true)'"
+                ),
                 "on-success": "ignore",
             }
         )
@@ -101,6 +178,42 @@ def get_pebble_layer(application_name, context):
     return pebble_layer
 
 
+def _restarts_services(container, pebble_layer):
+    """Check whether applying a pebble layer would restart running services.
+
+    Args:
+        container: the container the layer is for.
+        pebble_layer: the pebble layer dict.
+
+    Returns:
+        True if the layer changes the definition of a running service.
+    """
+    planned = container.get_plan().services
+    services = container.get_services()
+    for name, service in ops.pebble.Layer(pebble_layer).services.items():
+        if name not in services or not services[name].is_running():
+            continue
+        if _service_definition(planned.get(name)) != _service_definition(service):
+            return True
+    return False
+
+
+def _service_definition(service):
+    """Return a service definition comparable across a layer and the plan.
+
+    Args:
+        service: the pebble Service, or None.
+
+    Returns:
+        The service dict, with its environment values as pebble stores them.
+    """
+    if service is None:
+        return None
+    definition = service.to_dict()
+    definition["environment"] = {key: str(value) for key, value in definition.get("environment", {}).items()}
+    return definition
+
+
 class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
     """Airbyte Server charm.
 
@@ -109,6 +222,7 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
     """
 
     config_type = CharmConfig
+    _stored = ops.StoredState()
 
     def __init__(self, *args):
         """Construct.
@@ -117,17 +231,31 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
             args: Ignore.
         """
         super().__init__(*args)
-        kubernetes.config.load_incluster_config()
-        self._k8s_client = kubernetes.client.CoreV1Api()
+        self._dispatch_start = time.monotonic()
+        self._reconcile_requested = False
+        self._stored.set_default(registry_fetch_attempted=0.0)
+
+        # Registered first so that the pending reconcile runs before the charm's
+        # own metrics are flushed, on the same pre-commit event.
+        self.framework.observe(self.framework.on.pre_commit, self._on_pre_commit_reconcile)
 
         self.framework.observe(self.on.config_changed, self._on_config_changed)
+        self.framework.observe(self.on.remove, self._on_remove)
+        self.framework.observe(self.on.stop, self._on_stop)
         self.framework.observe(self.on.airbyte_peer_relation_changed, self._on_peer_relation_changed)
         self.framework.observe(self.on.update_status, self._on_update_status)
         self.framework.observe(self.on.secret_changed, self._on_secret_changed)
+        self.framework.observe(self.on.purge_job_history_action, self._on_purge_job_history_action)
+        self.framework.observe(self.on.refresh_connector_registry_action, self._on_refresh_connector_registry_action)
+        self.framework.observe(self.on.drain_action, self._on_drain_action)
 
         # Handle postgresql relation.
-        self.db = DatabaseRequires(self, relation_name="db", database_name="airbyte-k8s_db", extra_user_roles="admin")
-        self.postgresql = PostgresqlRelation(self)
+        self.db = DatabaseRequires(self, relation_name="db", database_name=DB_NAME, extra_user_roles="admin")
+        self.postgresql = PostgresqlRelation(self, self.db)
+
+        # Handle the optional connection pooler (pgbouncer) relation.
+        self.db_pooler = DatabaseRequires(self, relation_name="db-pooler", database_name=DB_NAME)
+        self.pgbouncer = PostgresqlRelation(self, self.db_pooler, relation_name="db-pooler")
 
         self.minio = MinioRelation(self)
 
@@ -138,30 +266,89 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
         # Handle UI relation
         self.airbyte_ui = AirbyteServerProvider(self)
 
+        # Restart the services of a limited number of units at a time.
+        self.rolling_restart = RollingRestart(self)
+
         # Airbyte server serves from the root of its backend, so strip_prefix=True
         # makes the ingress provider strip the per-app path prefix before forwarding.
-        self.ingress = IngressPerAppRequirer(self, port=INTERNAL_API_PORT, strip_prefix=True)
+        # With readiness-gated-service, only route to the units whose server is ready.
+        ingress_host = None
+        if self.model.config.get("readiness-gated-service"):
+            ingress_host = f"{self._server_service_name}.{self.model.name}.svc.cluster.local"
+        self.ingress = IngressPerAppRequirer(self, host=ingress_host, port=INTERNAL_API_PORT, strip_prefix=True)
         self.framework.observe(self.ingress.on.ready, self._on_ingress_ready)
         self.framework.observe(self.ingress.on.revoked, self._on_ingress_revoked)
 
         self._setup_observability()
 
-        for container_name in CONTAINER_HEALTH_CHECK_MAP:
+        self.framework.observe(self.on["airbyte-bootloader"].pebble_custom_notice, self._on_bootloader_notice)
+        for container_name, settings in CONTAINER_HEALTH_CHECK_MAP.items():
             self.framework.observe(self.on[container_name].pebble_ready, self._on_pebble_ready)
+            if settings:
+                self.framework.observe(self.on[container_name].pebble_check_failed, self._on_pebble_check)
+                self.framework.observe(self.on[container_name].pebble_check_recovered, self._on_pebble_check)
+
+    @functools.cached_property
+    def _kubernetes(self):
+        """Import the Kubernetes client and load the in-cluster config.
+
+        Most hooks never talk to the Kubernetes API, so the (slow to import)
+        client is only loaded on first use, once per dispatch.
+
+        Returns:
+            The kubernetes.client module.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        import kubernetes.client
+
+        kubernetes.config.load_incluster_config()
+        return kubernetes.client
+
+    @functools.cached_property
+    def _k8s_client(self):
+        """Kubernetes core API client.
+
+        Returns:
+            A CoreV1Api client.
+        """
+        return self._kubernetes.CoreV1Api()
+
+    @functools.cached_property
+    def _k8s_apps_client(self):
+        """Kubernetes apps API client.
+
+        Returns:
+            An AppsV1Api client.
+        """
+        return self._kubernetes.AppsV1Api()
 
     def _setup_observability(self):
-        """Wire up the COS observability integrations (logs, dashboards, metrics)."""
+        """Wire up the COS observability integrations (logs, dashboards, metrics, traces)."""
         # Forward workload logs to Loki and expose Grafana dashboards to COS.
-        self.log_forwarder = LogForwarder(self, relation_name="logging")
+        self.log_forwarder = LogForwarder(self, relation_name="logging", alert_rules_path=LOKI_ALERT_RULES_PATH)
         self.grafana_dashboards = GrafanaDashboardProvider(self, relation_name="grafana-dashboard")
 
-        # Push Airbyte's OTLP metrics to a related opentelemetry-collector: it shares its
-        # OTLP receiver endpoint over this relation, which Micrometer is pointed at.
-        self.otel_metrics = OtlpRequirer(self, relation_name="send-otlp", protocols=["http"], telemetries=["metrics"])
+        # Push Airbyte's OTLP metrics and traces to a related opentelemetry-collector: it
+        # shares its OTLP receiver endpoint over this relation, which Micrometer and the
+        # OpenTelemetry Java agent are pointed at. The bundled metric alert rules travel
+        # over the same relation on to COS; the log ones already reach Loki over `logging`.
+        rules = RuleStore(JujuTopology.from_charm(self)).add_promql_path(self.charm_dir / PROMETHEUS_ALERT_RULES_PATH)
+        self.otlp = OtlpRequirer(
+            self, relation_name="send-otlp", protocols=["http"], telemetries=["metrics", "traces"], rules=rules
+        )
         self.framework.observe(self.on["send-otlp"].relation_created, self._on_send_otlp_changed)
         self.framework.observe(self.on["send-otlp"].relation_changed, self._on_send_otlp_changed)
         self.framework.observe(self.on["send-otlp"].relation_broken, self._on_send_otlp_broken)
 
+        # The charm's own metrics (hook durations, replans, S3, K8s API and secret
+        # calls) are pushed to the same collector once the dispatch completes.
+        topology = JujuTopology.from_charm(self)
+        self.metrics = CharmMetrics(
+            self._stored,
+            {"service.name": "airbyte-k8s-charm", **{f"juju_{k}": v for k, v in topology.as_dict().items() if v}},
+        )
+        self.framework.observe(self.framework.on.pre_commit, self._on_pre_commit)
+
     @log_event_handler(logger)
     def _on_pebble_ready(self, event: ops.PebbleReadyEvent):
         """Handle pebble ready event.
@@ -171,6 +358,32 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
         """
         self.reconcile()
 
+    @log_event_handler(logger)
+    def _on_bootloader_notice(self, event: ops.PebbleCustomNoticeEvent):
+        """Handle the bootloader's completion notice.
+
+        The bootloader has migrated the database, so the leader records the
+        version for the other services to start without migrating.
+
+        Args:
+            event: The pebble custom notice event.
+        """
+        if event.notice.key != BOOTLOADER_COMPLETED_NOTICE:
+            return
+        peer_relation = self.model.get_relation("airbyte-peer")
+        if self.unit.is_leader() and peer_relation:
+            peer_relation.data[self.app][MIGRATED_VERSION_KEY] = AIRBYTE_VERSION
+        self.reconcile()
+
+    def _migrations_pending(self):
+        """Check whether the database is not yet migrated to the charm's Airbyte version.
+
+        Returns:
+            True unless a bootloader has recorded the migration in peer data.
+        """
+        peer_relation = self.model.get_relation("airbyte-peer")
+        return not peer_relation or peer_relation.data[self.app].get(MIGRATED_VERSION_KEY) != AIRBYTE_VERSION
+
     @log_event_handler(logger)
     def _on_ingress_ready(self, event):
         """Handle the ingress-ready event.
@@ -196,7 +409,7 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
         Args:
             event: The send-otlp relation-created/-changed event.
         """
-        self.otel_metrics.publish()
+        self.otlp.publish()
         self.reconcile()
 
     @log_event_handler(logger)
@@ -208,27 +421,41 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
         """
         self.reconcile()
 
-    def _get_otel_metrics_endpoint(self) -> str | None:
-        """Return the collector's OTLP/HTTP metrics endpoint from the send-otlp relation.
+    def _on_pre_commit(self, event):
+        """Record the dispatch duration and push the charm's own metrics.
+
+        Args:
+            event: The framework pre-commit event.
+        """
+        hook = os.environ.get("JUJU_DISPATCH_PATH", "").rpartition("/")[2] or "unknown"
+        self.metrics.observe("airbyte.charm.hook.duration", time.monotonic() - self._dispatch_start, event=hook)
+        self.metrics.flush(self._get_otlp_endpoint("metrics"))
+
+    def _get_otlp_endpoint(self, telemetry) -> str | None:
+        """Return the collector's OTLP/HTTP endpoint for a signal from the send-otlp relation.
+
+        Args:
+            telemetry: the signal to export, "metrics" or "traces".
 
         Returns:
-            The OTLP/HTTP endpoint URL, or None when no collector has shared an endpoint yet.
+            The OTLP/HTTP endpoint URL, or None when no collector has shared an endpoint
+            accepting the signal yet.
         """
-        endpoints = self.otel_metrics.endpoints
+        endpoints = self.otlp.endpoints
         if not endpoints:
             return None
         otlp = next(iter(endpoints.values()))
         endpoint = otlp.endpoint
-        if not endpoint:
+        if not endpoint or telemetry not in otlp.telemetries:
             return None
-        # Point Micrometer's OTLP/HTTP exporter at the metrics signal path the
-        # collector serves; ensure a scheme and append /v1/metrics if absent.
+        # Point the OTLP/HTTP exporter at the signal path the collector serves;
+        # ensure a scheme and append /v1/<signal> if absent.
         if "://" not in endpoint:
             endpoint = f"{'http' if otlp.insecure else 'https'}://{endpoint}"
         endpoint = endpoint.rstrip("/")
-        if not endpoint.endswith("/v1/metrics"):
-            endpoint += "/v1/metrics"
-        return endpoint
+        for signal in ("metrics", "traces"):
+            endpoint = endpoint.removesuffix(f"/v1/{signal}")
+        return f"{endpoint}/v1/{telemetry}"
 
     @log_event_handler(logger)
     def _on_peer_relation_changed(self, event):
@@ -255,11 +482,151 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
         Args:
             event: The `update-status` event triggered at intervals.
         """
+        try:
+            data = self._validate()
+        except ValueError:
+            return
+
+        self._purge_job_history_scheduled(data.db)
+        self._update_workload_status()
+
+    @log_event_handler(logger)
+    def _on_pebble_check(self, event: ops.PebbleCheckEvent):
+        """Handle pebble `check-failed` and `check-recovered` events.
+
+        Converges the status (and the server status shared with the UI) as soon
+        as a service's health check changes, instead of at the next update-status.
+
+        Args:
+            event: The event triggered when a pebble check failed or recovered.
+        """
+        if event.info.name != "up":
+            return
         try:
             self._validate()
         except ValueError:
             return
 
+        # A recovered service may let staged startup move on to the next stage.
+        if isinstance(event, ops.PebbleCheckRecoveredEvent) and self._startup_pending():
+            self.reconcile()
+            return
+        self._update_workload_status()
+
+    def _startup_pending(self):
+        """Check whether staged startup has runtime services left to start.
+
+        Returns:
+            True if a runtime service is not yet in its container's plan.
+        """
+        for stage in STARTUP_STAGES:
+            for container_name in stage:
+                container = self.unit.get_container(container_name)
+                if container.can_connect() and container_name not in container.get_plan().services:
+                    return True
+        return False
+
+    def _is_service_healthy(self, container, container_name):
+        """Check whether a service is running and passing its health check.
+
+        Args:
+            container: the service's container.
+            container_name: name of the container and of its service.
+
+        Returns:
+            True if the service is healthy.
+        """
+        if not container.can_connect():
+            return False
+        service = container.get_services(container_name).get(container_name)
+        if not service or not service.is_running():
+            return False
+        if not CONTAINER_HEALTH_CHECK_MAP[container_name]:
+            return True
+        # A fresh check reports up until it first fails: only trust it once it has
+        # succeeded (pebble versions not counting successes report None).
+        check = container.get_checks("up").get("up")
+        return check is not None and check.status == CheckStatus.UP and check.successes != 0
+
+    def _is_workload_healthy(self):
+        """Check whether every health-checked service is healthy, leaving drained ones out.
+
+        Returns:
+            True if the unit's services are healthy.
+        """
+        drained = self._is_drained()
+        return all(
+            self._is_service_healthy(self.unit.get_container(container_name), container_name)
+            for container_name, settings in CONTAINER_HEALTH_CHECK_MAP.items()
+            if settings and not (drained and container_name in DRAIN_CONTAINERS)
+        )
+
+    def _restart_health_check(self, container, container_name):
+        """Restart a restarted service's health check, resetting its success count.
+
+        The check otherwise keeps reporting the successes of the service's
+        previous run, so the restarted service would count as healthy at once.
+
+        Args:
+            container: the service's container.
+            container_name: name of the container and of its service.
+        """
+        if not CONTAINER_HEALTH_CHECK_MAP[container_name]:
+            return
+        try:
+            container.stop_checks("up")
+            container.start_checks("up")
+        except ops.pebble.APIError as err:
+            # Pebble only starts and stops checks from Juju 3.6.4.
+            logger.debug("Could not restart the health check of %s: %s", container_name, err)
+
+    def _get_startable_containers(self, pebble_layers):
+        """Return the containers whose services may be (re)started now.
+
+        A service is starting while it is not healthy yet or while applying its
+        layer would restart it. With `staged-startup`, a stage is only started
+        once the previous one is healthy and up to date. With
+        `startup-concurrency`, at most that many services are starting at the
+        same time. Healthy, up to date services are always kept configured.
+
+        Args:
+            pebble_layers: the pebble layers to apply, keyed by container name.
+
+        Returns:
+            A set of container names.
+        """
+        staged = self.config["staged-startup"]
+        concurrency = self.config["startup-concurrency"]
+        if not staged and not concurrency:
+            return set(CONTAINER_HEALTH_CHECK_MAP)
+
+        startable = {"airbyte-bootloader"}
+        starting = 0
+        for stage in STARTUP_STAGES:
+            stage_ready = True
+            for container_name in stage:
+                container = self.unit.get_container(container_name)
+                restarts = container_name in pebble_layers and _restarts_services(
+                    container, pebble_layers[container_name]
+                )
+                if not restarts and self._is_service_healthy(container, container_name):
+                    startable.add(container_name)
+                    continue
+                stage_ready = False
+                if not concurrency or starting < concurrency:
+                    starting += 1
+                    startable.add(container_name)
+            if staged and not stage_ready:
+                break
+        return startable
+
+    def _update_workload_status(self):
+        """Set the unit status from the services' pebble plans and health checks."""
+        self._label_server_readiness()
+        if self._is_drained():
+            self.unit.status = MaintenanceStatus("unit drained")
+            return
+
         all_valid_plans = True
         for container_name, settings in CONTAINER_HEALTH_CHECK_MAP.items():
             if not settings:
@@ -284,11 +651,143 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
             self.reconcile()
             return
 
+        if self.rolling_restart.is_requested():
+            # Let the reconcile apply the restart waiting for the lock or, once
+            # it is applied and the services are healthy, release the lock.
+            self.reconcile()
+            return
+
         self.unit.set_workload_version(f"v{AIRBYTE_VERSION}")
         self.unit.status = ActiveStatus()
         if self.unit.is_leader():
             self.airbyte_ui._provide_server_status()
 
+    def _purge_job_history_scheduled(self, db_connection):
+        """Purge a bounded amount of expired job history when retention is configured.
+
+        Args:
+            db_connection: the database connection details.
+        """
+        retention_days = self.config["job-history-retention-days"]
+        if not retention_days or not self.unit.is_leader():
+            return
+
+        container = self.unit.get_container("airbyte-server")
+        if not container.can_connect():
+            return
+
+        try:
+            result = purge_job_history(
+                container,
+                db_connection,
+                older_than_days=retention_days,
+                batch_size=self.config["job-history-purge-batch-size"],
+                max_batches=JOB_HISTORY_PURGE_MAX_BATCHES,
+            )
+        except ops.pebble.Error as err:
+            logger.error("Error purging job history: %s", str(err))
+            return
+        logger.info(
+            "Purged %d jobs and %d attempts older than %d days in %.1fs",
+            result.jobs,
+            result.attempts,
+            retention_days,
+            result.duration,
+        )
+
+    @log_event_handler(logger)
+    def _on_purge_job_history_action(self, event: ops.ActionEvent):
+        """Handle the purge-job-history action.
+
+        Args:
+            event: The action event.
+        """
+        try:
+            data = self._validate()
+        except ValueError as err:
+            event.fail(f"charm not ready: {err}")
+            return
+
+        container = self.unit.get_container("airbyte-server")
+        if not container.can_connect():
+            event.fail("airbyte-server container not ready")
+            return
+
+        event.log("Purging job history")
+        try:
+            result = purge_job_history(
+                container,
+                data.db,
+                older_than_days=event.params["older-than-days"],
+                batch_size=event.params["batch-size"],
+                max_batches=event.params["max-batches"],
+            )
+        except ops.pebble.Error as err:
+            event.fail(f"failed to purge job history: {err}")
+            return
+
+        event.set_results(
+            {
+                "jobs-removed": result.jobs,
+                "attempts-removed": result.attempts,
+                "batches": result.batches,
+                "duration-seconds": round(result.duration, 3),
+            }
+        )
+
+    def _on_refresh_connector_registry_action(self, event: ops.ActionEvent):
+        """Handle the refresh-connector-registry action.
+
+        Args:
+            event: The action event.
+        """
+        if not self.config["connector-registry-mirror"]:
+            event.fail("connector-registry-mirror is not enabled")
+            return
+
+        container = self.unit.get_container(CONNECTOR_REGISTRY_MIRROR_CONTAINER)
+        if not container.can_connect():
+            event.fail(f"{CONNECTOR_REGISTRY_MIRROR_CONTAINER} container not ready")
+            return
+
+        event.log(f"Fetching the connector registry from {self.config['connector-registry-source-url']}")
+        try:
+            files = self._mirror_connector_registry(container)
+        except (ValueError, ops.pebble.Error) as err:
+            event.fail(f"failed to refresh the connector registry: {err}")
+            return
+
+        event.set_results({"connectors": count_connectors(files)})
+
+    def _mirror_connector_registry(self, container):
+        """Download the connector registry and stubs into the mirror.
+
+        Args:
+            container: the container serving the mirror.
+
+        Returns:
+            The mirrored files, keyed by path.
+        """
+        files = fetch_registry(self.config["connector-registry-source-url"])
+        push_registry(container, files)
+        return files
+
+    def _populate_connector_registry(self, container):
+        """Populate the empty mirror, at most once per retry interval.
+
+        Args:
+            container: the container serving the mirror.
+        """
+        now = time.time()
+        if now - self._stored.registry_fetch_attempted < CONNECTOR_REGISTRY_FETCH_RETRY_INTERVAL:
+            return
+        self._stored.registry_fetch_attempted = now
+        try:
+            self._mirror_connector_registry(container)
+        except (ValueError, ops.pebble.Error) as err:
+            # The mirror then answers 404 at once instead of a slow egress timeout.
+            logger.warning("Connector registry mirror not populated: %s", err)
+
     def _validate_pebble_plan(self, container, container_name):
         """Validate pebble plan.
 
@@ -305,6 +804,129 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
         except (KeyError, ops.pebble.ConnectionError):
             return False
 
+    @log_event_handler(logger)
+    def _on_stop(self, event):
+        """Drain the unit before its pod is terminated.
+
+        The drain is cut short by the pod's termination grace period, and its
+        errors are logged rather than failing the hook during unit removal.
+
+        Args:
+            event: The stop event.
+        """
+        deadline = self._dispatch_start + self._get_termination_grace_period() - TERMINATION_GRACE_PERIOD_MARGIN
+        try:
+            self._drain(deadline=deadline)
+        except ops.pebble.Error as err:
+            logger.error("Error draining the unit: %s", str(err))
+
+    def _get_termination_grace_period(self):
+        """Return the termination grace period of the unit's pod.
+
+        Returns:
+            The grace period in seconds, or Kubernetes' default if it cannot be read.
+        """
+        try:
+            with self.metrics.timer("airbyte.charm.k8s.api.duration", operation="read_pod"):
+                pod = self._k8s_client.read_namespaced_pod(self.unit.name.replace("/", "-"), self.model.name)
+        except self._kubernetes.exceptions.ApiException as err:
+            logger.error("Error reading the pod's termination grace period: %s", str(err))
+            return TERMINATION_GRACE_PERIOD_DEFAULT
+        return pod.spec.termination_grace_period_seconds or TERMINATION_GRACE_PERIOD_DEFAULT
+
+    @log_event_handler(logger)
+    def _on_drain_action(self, event: ops.ActionEvent):
+        """Handle the drain action.
+
+        Args:
+            event: The action event.
+        """
+        peer_relation = self.model.get_relation("airbyte-peer")
+        if not peer_relation:
+            event.fail("peer relation not ready")
+            return
+
+        if event.params["resume"]:
+            peer_relation.data[self.unit].pop(DRAINED_KEY, None)
+            event.log("Resuming the drained services")
+            self.reconcile()
+            return
+
+        peer_relation.data[self.unit][DRAINED_KEY] = "true"
+        event.log(f"Draining {', '.join(DRAIN_CONTAINERS)}")
+        try:
+            self._drain()
+        except ops.pebble.Error as err:
+            event.fail(f"failed to drain: {err}")
+            return
+        self.unit.status = MaintenanceStatus("unit drained")
+
+    def _drain(self, deadline=None):
+        """Stop the services claiming workloads, letting in-flight ones finish.
+
+        Each service gets SIGTERM and `drain-timeout` seconds (its pebble
+        kill-delay) to shut down gracefully before being killed.
+
+        Args:
+            deadline: optional time.monotonic() value past which to stop waiting.
+        """
+        for container_name in DRAIN_CONTAINERS:
+            container = self.unit.get_container(container_name)
+            if not container.can_connect():
+                continue
+            service = container.get_services(container_name).get(container_name)
+            if not service or not service.is_running():
+                continue
+            timeout = self.config["drain-timeout"] + 30
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    logger.warning("No time left to drain %s", container_name)
+                    return
+            logger.info("Draining %s", container_name)
+            container.pebble.stop_services([container_name], timeout=timeout)
+
+    def _is_drained(self):
+        """Check whether the unit has been drained by the drain action.
+
+        Returns:
+            True if the workload launcher and workers are to be kept stopped.
+        """
+        peer_relation = self.model.get_relation("airbyte-peer")
+        return bool(peer_relation and peer_relation.data[self.unit].get(DRAINED_KEY))
+
+    @log_event_handler(logger)
+    def _on_remove(self, event):
+        """Clean up the Kubernetes resources managed by the charm.
+
+        The resources are deleted where the peer application data records them
+        as applied; without the peer relation the config is used instead.
+
+        Args:
+            event: The remove event.
+        """
+        if not self.unit.is_leader():
+            return
+        peer_relation = self.model.get_relation("airbyte-peer")
+        if peer_relation:
+            prepull_namespace = peer_relation.data[self.app].get(IMAGE_PREPULL_NAMESPACE_KEY)
+            server_service = bool(peer_relation.data[self.app].get(SERVER_SERVICE_KEY))
+        else:
+            prepull_namespace = self._job_namespace if self.config["image-prepull-enabled"] else None
+            server_service = self.config["readiness-gated-service"]
+        if prepull_namespace:
+            try:
+                with self.metrics.timer("airbyte.charm.k8s.api.duration", operation="delete_daemonset"):
+                    delete_daemonset(self._k8s_apps_client, self._image_prepull_name, prepull_namespace)
+            except self._kubernetes.exceptions.ApiException as err:
+                logger.error("Error deleting image pre-pull DaemonSet: %s", str(err))
+        if server_service:
+            try:
+                with self.metrics.timer("airbyte.charm.k8s.api.duration", operation="delete_service"):
+                    delete_service(self._k8s_client, self._server_service_name, self.model.name)
+            except self._kubernetes.exceptions.ApiException as err:
+                logger.error("Error deleting server Service: %s", str(err))
+
     @log_event_handler(logger)
     def _on_config_changed(self, event):
         """Handle changed configuration.
@@ -333,6 +955,8 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
         if db_connection is None:
             raise ValueError("database relation not ready")
 
+        db_pooler_connection = self._get_db_pooler_connection(db_connection)
+
         minio_connection = self.minio.get_data()
         s3_connection = self.s3_relation.get_data()
 
@@ -358,15 +982,68 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
             if missing_params:
                 raise ValueError(f"s3:missing parameters {missing_params!r}")
 
+        max_connections = self.config["database-max-connections"]
+        if max_connections:
+            required_connections = get_database_connection_budget(
+                self.config, self.app.planned_units(), pooled=db_pooler_connection is not None
+            )
+            if required_connections > max_connections:
+                raise ValueError(
+                    f"database pools need {required_connections} connections, "
+                    f"above database-max-connections ({max_connections})"
+                )
+
+        self._validate_worker_ports()
+
         credentials = self._resolve_credentials()
 
         return ReconcileData(
             db=db_connection,
+            db_pooler=db_pooler_connection,
             minio=minio_connection,
             s3=s3_connection,
             credentials=credentials,
         )
 
+    def _validate_worker_ports(self):
+        """Check the Temporal worker port range against the services' ports and concurrency.
+
+        Raises:
+            ValueError: if the range overlaps a service port, exceeds the valid
+                ports or is smaller than the number of concurrent jobs.
+        """
+        worker_ports = get_temporal_worker_ports(self.config)
+        if set(worker_ports) & set(RESERVED_PORTS) or worker_ports.stop > 65536:
+            raise ValueError(f"temporal worker ports {worker_ports.start}-{worker_ports.stop - 1} not available")
+        worker_concurrency = get_worker_concurrency(self.config)
+        if len(worker_ports) < worker_concurrency:
+            raise ValueError(
+                f"temporal-worker-port-count ({len(worker_ports)}) below the {worker_concurrency} "
+                f"concurrent jobs allowed by max-*-workers"
+            )
+
+    def _get_db_pooler_connection(self, db_connection):
+        """Return the connection pooler details, if a pooler is configured.
+
+        The db-pooler relation takes precedence over the `database-pooler-endpoint`
+        config, which reuses the credentials of the db relation.
+
+        Args:
+            db_connection: the direct database connection details.
+
+        Returns:
+            A DatabaseConnection for the pooler, or None if no pooler is configured
+            or its relation is not yet ready.
+        """
+        if self.model.get_relation("db-pooler"):
+            return self.pgbouncer.get_data()
+
+        endpoint = self.config["database-pooler-endpoint"]
+        if not endpoint:
+            return None
+        host, _, port = endpoint.rpartition(":")
+        return dataclasses.replace(db_connection, host=host, port=port)
+
     def _resolve_credentials(self):
         """Resolve secret-backed credentials from Juju secrets.
 
@@ -408,6 +1085,7 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
             ValueError: if the secret is missing, inaccessible, or is missing
                 any of the required keys.
         """
+        self.metrics.increment("airbyte.charm.secret.fetches", source="juju")
         try:
             content = self.model.get_secret(id=secret_id).get_content(refresh=True)
         except ops.SecretNotFoundError as err:
@@ -432,9 +1110,11 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
             airbyte-auth-secrets secret exists and is populated, or an empty dict
             if it has not been created yet (the bootloader creates it on startup).
         """
+        self.metrics.increment("airbyte.charm.secret.fetches", source="kubernetes")
         try:
-            secret = self._k8s_client.read_namespaced_secret(AIRBYTE_AUTH_K8S_SECRET_NAME, self.model.name)
-        except ApiException as err:
+            with self.metrics.timer("airbyte.charm.k8s.api.duration", operation="read_secret"):
+                secret = self._k8s_client.read_namespaced_secret(AIRBYTE_AUTH_K8S_SECRET_NAME, self.model.name)
+        except self._kubernetes.exceptions.ApiException as err:
             if err.status == 404:
                 logger.info("Secret %r not yet created in namespace %r", AIRBYTE_AUTH_K8S_SECRET_NAME, self.model.name)
             else:
@@ -449,12 +1129,149 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
             env["DATAPLANE_CLIENT_SECRET"] = decoded["dataplane-client-secret"]
         return env
 
-    def reconcile(self):  # noqa: C901
+    @property
+    def _image_prepull_name(self):
+        """Name of the image pre-pull DaemonSet.
+
+        Returns:
+            The DaemonSet name, derived from the application name.
+        """
+        return f"{self.app.name}-image-prepull"
+
+    def _get_prepull_images(self):
+        """Return the job pod images to pre-pull, without duplicates.
+
+        Returns:
+            A list of image references in a stable order.
+        """
+        images = [BASE_ENV[key] for key in IMAGE_PREPULL_BASE_ENV_KEYS]
+        images.extend(self.config[key] for key in IMAGE_PREPULL_CONFIGS if self.config[key])
+        images.extend(image.strip() for image in (self.config["image-prepull-images"] or "").split(","))
+        return list(dict.fromkeys(image for image in images if image))
+
+    @property
+    def _job_namespace(self):
+        """Namespace the job pods, and the image pre-pull DaemonSet, run in.
+
+        Returns:
+            The `job-kube-namespace` config value, defaulting to the model name.
+        """
+        return self.config["job-kube-namespace"] or self.model.name
+
+    def _reconcile_image_prepull(self):
+        """Create, update or remove the image pre-pull DaemonSet according to config.
+
+        Only the leader manages the DaemonSet. The namespace it was applied in is
+        recorded in the peer application data, so that it is only deleted once it
+        exists, including when `job-kube-namespace` changes. Failures are logged
+        rather than blocking the charm since pre-pulling is an optimisation.
+        """
+        if not self.unit.is_leader():
+            return
+
+        peer_data = self.model.get_relation("airbyte-peer").data[self.app]
+        applied_namespace = peer_data.get(IMAGE_PREPULL_NAMESPACE_KEY)
+        namespace = self._job_namespace if self.config["image-prepull-enabled"] else None
+        try:
+            if applied_namespace and applied_namespace != namespace:
+                with self.metrics.timer("airbyte.charm.k8s.api.duration", operation="delete_daemonset"):
+                    delete_daemonset(self._k8s_apps_client, self._image_prepull_name, applied_namespace)
+                del peer_data[IMAGE_PREPULL_NAMESPACE_KEY]
+            if not namespace:
+                return
+
+            manifest = build_prepull_daemonset(
+                self._image_prepull_name,
+                namespace,
+                self._get_prepull_images(),
+                node_selector=parse_key_value_pairs(self.config["job-kube-node-selectors"]),
+                tolerations=parse_tolerations(self.config["job-kube-tolerations"]),
+                pull_secret=self.config["job-kube-main-container-image-pull-secret"],
+                tools_image=self.config["job-kube-busybox-image"],
+            )
+            with self.metrics.timer("airbyte.charm.k8s.api.duration", operation="apply_daemonset"):
+                apply_daemonset(self._k8s_apps_client, manifest)
+            peer_data[IMAGE_PREPULL_NAMESPACE_KEY] = namespace
+        except self._kubernetes.exceptions.ApiException as err:
+            logger.error("Error reconciling image pre-pull DaemonSet: %s", str(err))
+
+    @property
+    def _server_service_name(self):
+        """Name of the readiness-gated server Service.
+
+        Returns:
+            The Service name, derived from the application name.
+        """
+        return f"{self.app.name}-server"
+
+    def _reconcile_server_service(self):
+        """Create, update or remove the readiness-gated server Service as configured.
+
+        Only the leader manages the Service. Whether it was applied is recorded in
+        the peer application data, so that it is only deleted once it exists.
+        """
+        if not self.unit.is_leader():
+            return
+
+        peer_data = self.model.get_relation("airbyte-peer").data[self.app]
+        try:
+            if not self.config["readiness-gated-service"]:
+                if peer_data.get(SERVER_SERVICE_KEY):
+                    with self.metrics.timer("airbyte.charm.k8s.api.duration", operation="delete_service"):
+                        delete_service(self._k8s_client, self._server_service_name, self.model.name)
+                    del peer_data[SERVER_SERVICE_KEY]
+                return
+
+            manifest = build_server_service(
+                self._server_service_name, self.model.name, self.app.name, SERVER_SERVICE_PORTS
+            )
+            with self.metrics.timer("airbyte.charm.k8s.api.duration", operation="apply_service"):
+                apply_service(self._k8s_client, manifest)
+            peer_data[SERVER_SERVICE_KEY] = "true"
+        except self._kubernetes.exceptions.ApiException as err:
+            logger.error("Error reconciling server Service: %s", str(err))
+
+    def _label_server_readiness(self, ready=None):
+        """Label the unit's pod with its server's readiness, selected by the server Service.
+
+        Args:
+            ready: Readiness to label the pod with; defaults to the server's health.
+        """
+        if not self.config["readiness-gated-service"]:
+            return
+
+        if ready is None:
+            ready = self._is_service_healthy(self.unit.get_container("airbyte-server"), "airbyte-server")
+        try:
+            with self.metrics.timer("airbyte.charm.k8s.api.duration", operation="label_pod"):
+                set_server_ready_label(self._k8s_client, self.unit.name.replace("/", "-"), self.model.name, ready)
+        except self._kubernetes.exceptions.ApiException as err:
+            logger.error("Error labelling the pod with the server readiness: %s", str(err))
+
+    def reconcile(self):
+        """Request a reconcile of the charm to its desired state.
+
+        Single entry point for every observer. The reconcile itself runs once at
+        the end of the dispatch, however many events (deferred ones included)
+        requested it.
+        """
+        self._reconcile_requested = True
+
+    def _on_pre_commit_reconcile(self, event):
+        """Run the reconcile requested by this dispatch's events, if any.
+
+        Args:
+            event: The framework pre-commit event.
+        """
+        if self._reconcile_requested:
+            self._reconcile_requested = False
+            self._reconcile()
+
+    def _reconcile(self):  # noqa: C901
         """Reconcile the charm to its desired state.
 
-        Single entry point for every observer: derives the desired state from
-        the current model (config + relations) and converges the workload
-        toward it. Holds no persisted state of its own.
+        Derives the desired state from the current model (config + relations)
+        and converges the workload toward it. Holds no persisted state of its own.
         """
         try:
             data = self._validate()
@@ -463,6 +1280,7 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
             return
 
         db_connection = data.db
+        db_pooler_connection = data.db_pooler
         minio_connection = data.minio
         s3_connection = data.s3
         credentials = data.credentials
@@ -471,15 +1289,23 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
         if self.config["storage-type"] == StorageType.minio:
             s3_parameters = minio_connection
 
+        # Only reconciling hooks need boto3, which is slow to import.
+        # pylint: disable-next=import-outside-toplevel
+        from botocore.exceptions import ClientError
+
+        # pylint: disable-next=import-outside-toplevel
+        from s3_helpers import S3Client
+
         try:
-            s3_client = S3Client(s3_parameters)
+            with self.metrics.timer("airbyte.charm.s3.provisioning.duration"):
+                s3_client = S3Client(s3_parameters)
 
-            for bucket_config in BUCKET_CONFIGS:
-                bucket = self.config[bucket_config]
-                s3_client.create_bucket_if_not_exists(bucket)
+                for bucket_config in BUCKET_CONFIGS:
+                    bucket = self.config[bucket_config]
+                    s3_client.create_bucket_if_not_exists(bucket)
 
-            logs_ttl = int(self.config["logs-ttl"])
-            s3_client.set_bucket_lifecycle_policy(bucket_name=self.config[LOGS_BUCKET_CONFIG], ttl=logs_ttl)
+                logs_ttl = int(self.config["logs-ttl"])
+                s3_client.set_bucket_lifecycle_policy(bucket_name=self.config[LOGS_BUCKET_CONFIG], ttl=logs_ttl)
         except (ClientError, ValueError) as e:
             logger.error(f"Error creating bucket and setting lifecycle policy: {e}")
             self.unit.status = BlockedStatus(f"failed to create buckets: {str(e)}")
@@ -493,22 +1319,39 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
             WORKLOAD_LAUNCHER_PORT,
         )
 
+        self._reconcile_image_prepull()
+        self._reconcile_server_service()
+        self._label_server_readiness()
+
         if not self.ingress.url:
             logger.info("Ingress relation not configured; Airbyte is not exposed via ingress")
 
         # Runtime services crash without DATAPLANE_CLIENT_ID/SECRET, so until the secret exists
-        # configure only the bootloader and leave the rest unconfigured; update-status then
-        # re-reconciles once it appears.
+        # configure only the bootloader and leave the rest unconfigured; the bootloader's
+        # completion notice (or else update-status) then re-reconciles once it appears.
+        # Likewise they wait for the bootloader to migrate the database to this version,
+        # rather than migrating on startup, which would change their layers once recorded.
         dataplane_env = self._get_auth_secret_env()
 
-        otel_collector_endpoint = self._get_otel_metrics_endpoint()
+        otel_collector_endpoint = self._get_otlp_endpoint("metrics")
+        otel_traces_endpoint = self._get_otlp_endpoint("traces")
+        log4j2_overlay = build_log4j2_overlay(self.config)
+        migrations_pending = self._migrations_pending()
+        log4j2_job_logs = None
+        if self.config["job-logs-compressed"]:
+            log4j2_job_logs = (self.charm_dir / LOG4J2_JOB_LOGS_SOURCE).read_text()
 
+        drained = self._is_drained()
+        pebble_layers = {}
         for container_name in CONTAINER_HEALTH_CHECK_MAP:
             container = self.unit.get_container(container_name)
-            if not container.can_connect():
-                continue
-
-            if not dataplane_env and container_name != "airbyte-bootloader":
+            if (
+                not container.can_connect()
+                or (drained and container_name in DRAIN_CONTAINERS)
+                or (not dataplane_env and container_name != "airbyte-bootloader")
+                or (migrations_pending and container_name != "airbyte-bootloader")
+            ):
+                self.metrics.increment("airbyte.charm.replans", container=container_name, result="skipped")
                 continue
 
             env = create_env(
@@ -521,18 +1364,90 @@ class AirbyteK8SOperatorCharm(TypedCharmBase[CharmConfig]):
                 s3_connection=s3_connection,
                 credentials=credentials,
                 otel_collector_endpoint=otel_collector_endpoint,
+                otel_traces_endpoint=otel_traces_endpoint,
+                db_pooler_connection=db_pooler_connection,
+                unit_number=int(self.unit.name.rpartition("/")[2]),
             )
             env = {k: v for k, v in env.items() if v is not None}
             env.update(dataplane_env)
 
-            pebble_layer = get_pebble_layer(container_name, env)
+            if log4j2_overlay:
+                container.push(LOG4J2_OVERLAY_PATH, log4j2_overlay, make_dirs=True)
+            if log4j2_job_logs:
+                container.push(LOG4J2_JOB_LOGS_PATH, log4j2_job_logs, make_dirs=True)
+
+            registry_mirror = (
+                self.config["connector-registry-mirror"] and container_name == CONNECTOR_REGISTRY_MIRROR_CONTAINER
+            )
+            if registry_mirror and not is_registry_mirrored(container):
+                self._populate_connector_registry(container)
+
+            kill_delay = self.config["drain-timeout"] if container_name in DRAIN_CONTAINERS else None
+            pebble_layer = get_pebble_layer(container_name, env, registry_mirror=registry_mirror, kill_delay=kill_delay)
+            if not registry_mirror and CONNECTOR_REGISTRY_MIRROR_SERVICE in container.get_plan().services:
+                # Keep a mirror turned off from being started again by replan.
+                pebble_layer["services"][CONNECTOR_REGISTRY_MIRROR_SERVICE] = {
+                    "override": "merge",
+                    "startup": "disabled",
+                }
+            pebble_layers[container_name] = pebble_layer
+
+        startable_containers = self._get_startable_containers(pebble_layers)
+        self.rolling_restart.grant()
+        restart_pending = False
+        restarted = False
+        for container_name, pebble_layer in pebble_layers.items():
+            container = self.unit.get_container(container_name)
+            if container_name not in startable_containers:
+                self.metrics.increment("airbyte.charm.replans", container=container_name, result="skipped")
+                continue
+            restarts = _restarts_services(container, pebble_layer)
+            if restarts and not self.rolling_restart.acquire():
+                restart_pending = True
+                self.metrics.increment("airbyte.charm.replans", container=container_name, result="skipped")
+                continue
+            if restarts and container_name == "airbyte-server":
+                # Take the unit out of the server Service before its server goes down.
+                self._label_server_readiness(ready=False)
             container.add_layer(container_name, pebble_layer, combine=True)
             container.replan()
+            if restarts:
+                restarted = True
+                self._restart_health_check(container, container_name)
+            mirror_layer = pebble_layer["services"].get(CONNECTOR_REGISTRY_MIRROR_SERVICE, {})
+            mirror_service = container.get_services(CONNECTOR_REGISTRY_MIRROR_SERVICE).get(
+                CONNECTOR_REGISTRY_MIRROR_SERVICE
+            )
+            if mirror_layer.get("startup") == "disabled" and mirror_service and mirror_service.is_running():
+                container.stop(CONNECTOR_REGISTRY_MIRROR_SERVICE)
+            self.metrics.increment("airbyte.charm.replans", container=container_name, result="performed")
+
+        # Pass the lock on once every restart is applied and the services restarted
+        # by an earlier reconcile have passed their health checks again.
+        if (
+            not restarted
+            and not restart_pending
+            and startable_containers.issuperset(pebble_layers)
+            and self._is_workload_healthy()
+        ):
+            self.rolling_restart.release()
 
         if not dataplane_env:
             self.unit.status = WaitingStatus("waiting for airbyte-auth-secrets")
             return
 
+        if migrations_pending:
+            self.unit.status = WaitingStatus("waiting for database migrations")
+            return
+
+        if restart_pending:
+            self.unit.status = WaitingStatus("waiting for rolling restart lock")
+            return
+
+        if drained:
+            self.unit.status = MaintenanceStatus("unit drained")
+            return
+
         self.unit.status = MaintenanceStatus("replanning application")
 
 
@@ -4,6 +4,7 @@
 """Charm helpers."""
 
 import os
+import re
 from urllib.parse import urlparse
 
 from connections import DatabaseConnection, ObjectStorageConnection, S3Connection
@@ -11,13 +12,27 @@ from literals import (
     AIRBYTE_API_PORT,
     BASE_ENV,
     CONNECTOR_BUILDER_SERVER_API_PORT,
+    CONNECTOR_REGISTRY_FILES,
+    CONNECTOR_REGISTRY_MIRROR_PORT,
+    DATABASE_POOL_CONTAINERS,
+    DATABASE_POOL_DATASOURCES,
+    DATABASE_POOL_SETTINGS,
     INTERNAL_API_PORT,
+    JOB_LOGS_UPLOAD_WINDOW,
+    LOG4J2_JOB_LOGS_PATH,
+    LOG4J2_OVERLAY_PATH,
+    METRICS_EXPORT_SETTINGS,
+    OTEL_JAVA_AGENT_PATH,
+    TELEMETRY_CONTAINERS,
+    WORKER_CONCURRENCY_CONFIGS,
+    WORKER_TASK_QUEUES,
     WORKLOAD_API_PORT,
 )
+from log4j_helpers import build_log4j2_overlay, get_log_level
 from structured_config import StorageType
 
 
-def create_env(
+def create_env(  # noqa: C901
     model_name,
     app_name,
     container_name,
@@ -28,6 +43,9 @@ def create_env(
     s3_connection: S3Connection | None,
     credentials: dict,
     otel_collector_endpoint: str | None = None,
+    otel_traces_endpoint: str | None = None,
+    db_pooler_connection: DatabaseConnection | None = None,
+    unit_number: int = 0,
 ):
     """Create set of environment variables for application.
 
@@ -41,6 +59,9 @@ def create_env(
         s3_connection: S3 details derived from the s3 relation, or None.
         credentials: Credentials resolved from Juju secrets (empty if none configured).
         otel_collector_endpoint: OTLP endpoint discovered from the send-otlp relation, or None.
+        otel_traces_endpoint: OTLP traces endpoint discovered from the send-otlp relation, or None.
+        db_pooler_connection: Connection pooler details, or None when not configured.
+        unit_number: Number of the unit, selecting its `worker-task-queue-overrides`.
 
     Returns:
         environment variables dict.
@@ -48,7 +69,11 @@ def create_env(
     host = db_connection.host
     port = db_connection.port
     db_name = db_connection.dbname
-    db_url = f"jdbc:postgresql://{host}:{port}/{db_name}"
+    db_endpoints = db_connection.endpoints or (f"{host}:{port}",)
+    # With several endpoints the driver tries each in turn until it finds the primary.
+    db_params = {"targetServerType": "primary"} if len(db_endpoints) > 1 else {}
+    db_url = _get_jdbc_url(db_endpoints, db_name, db_params)
+    server_host = get_server_host(app_name, config)
     secret_persistence = config["secret-persistence"]
     if secret_persistence:
         secret_persistence = config["secret-persistence"].value
@@ -58,7 +83,9 @@ def create_env(
     env = {
         **BASE_ENV,
         # Airbye services config
-        "LOG_LEVEL": config["log-level"].value,
+        "LOG_LEVEL": get_log_level(config, container_name),
+        # Only the bootloader migrates; the charm holds the other services until it has.
+        "RUN_DATABASE_MIGRATION_ON_STARTUP": str(container_name == "airbyte-bootloader").lower(),
         "TEMPORAL_HOST": config["temporal-host"],
         "WEBAPP_URL": config["webapp-url"],
         # Secrets config
@@ -105,6 +132,7 @@ def create_env(
         "MAX_CHECK_WORKERS": config["max-check-workers"],
         "MAX_SYNC_WORKERS": config["max-sync-workers"],
         "MAX_DISCOVER_WORKERS": config["max-discover-workers"],
+        "TEMPORAL_WORKER_PORTS": ",".join(str(port) for port in get_temporal_worker_ports(config)),
         # Data retention config
         "TEMPORAL_HISTORY_RETENTION_IN_DAYS": config["temporal-history-retention-in-days"],
         # Kubernetes config
@@ -141,22 +169,83 @@ def create_env(
         "DATABASE_DB": db_name,
         "DATABASE_HOST": host,
         "DATABASE_PORT": port,
-        "KEYCLOAK_DATABASE_URL": db_url + "?currentSchema=keycloak",
+        "KEYCLOAK_DATABASE_URL": _get_jdbc_url(db_endpoints, db_name, {**db_params, "currentSchema": "keycloak"}),
         "JOB_KUBE_SERVICEACCOUNT": app_name,
         "RUNNING_TTL_MINUTES": config["pod-running-ttl-minutes"],
         "SUCCEEDED_TTL_MINUTES": config["pod-successful-ttl-minutes"],
         "UNSUCCESSFUL_TTL_MINUTES": config["pod-unsuccessful-ttl-minutes"],
-        "INTERNAL_API_HOST": f"http://{app_name}:{INTERNAL_API_PORT}",
-        "AIRBYTE_SERVER_HOST": f"{app_name}:{INTERNAL_API_PORT}",
-        "CONFIG_API_HOST": f"{app_name}:{INTERNAL_API_PORT}",
+        "INTERNAL_API_HOST": f"http://{server_host}:{INTERNAL_API_PORT}",
+        "AIRBYTE_SERVER_HOST": f"{server_host}:{INTERNAL_API_PORT}",
+        "CONFIG_API_HOST": f"{server_host}:{INTERNAL_API_PORT}",
         "CONNECTOR_BUILDER_SERVER_API_HOST": f"{app_name}:{CONNECTOR_BUILDER_SERVER_API_PORT}",
         "CONNECTOR_BUILDER_API_HOST": f"{app_name}:{CONNECTOR_BUILDER_SERVER_API_PORT}",
-        "AIRBYTE_API_HOST": f"{app_name}:{AIRBYTE_API_PORT}/api/public",
+        "AIRBYTE_API_HOST": f"{server_host}:{AIRBYTE_API_PORT}/api/public",
         "WORKLOAD_API_HOST": f"{app_name}:{WORKLOAD_API_PORT}",
         "WORKLOAD_API_BEARER_TOKEN": ".Values.workload-api.bearerToken",  # nosec
-        "CONTROL_PLANE_TOKEN_ENDPOINT": f"http://{app_name}:{INTERNAL_API_PORT}/api/v1/dataplanes/token",
+        "CONTROL_PLANE_TOKEN_ENDPOINT": f"http://{server_host}:{INTERNAL_API_PORT}/api/v1/dataplanes/token",
     }
 
+    if db_pooler_connection and container_name in get_database_pooler_services(config):
+        # Transaction pooling hands each transaction a different server connection,
+        # so server-side prepared statements must be disabled. Migrations take
+        # session-level locks, so pooled services leave them to the bootloader.
+        pooler_url = _get_jdbc_url(
+            (f"{db_pooler_connection.host}:{db_pooler_connection.port}",),
+            db_pooler_connection.dbname,
+            {"prepareThreshold": "0"},
+        )
+        env.update(
+            {
+                "DATABASE_URL": pooler_url,
+                "DATABASE_USER": db_pooler_connection.user,
+                "DATABASE_PASSWORD": db_pooler_connection.password,
+                "DATABASE_HOST": db_pooler_connection.host,
+                "DATABASE_PORT": db_pooler_connection.port,
+                "RUN_DATABASE_MIGRATION_ON_STARTUP": "false",
+            }
+        )
+
+    worker_task_queues = get_worker_task_queues(config, unit_number)
+    for task_queue, setting in WORKER_TASK_QUEUES.items():
+        env[setting] = str(task_queue in worker_task_queues).lower()
+
+    if config["connector-registry-mirror"]:
+        mirror_url = f"http://localhost:{CONNECTOR_REGISTRY_MIRROR_PORT}"
+        env.update(
+            {
+                "CONNECTOR_REGISTRY_BASE_URL": mirror_url,
+                "ENTERPRISE_SOURCE_STUBS_URL": f"{mirror_url}/{CONNECTOR_REGISTRY_FILES[1]}",
+            }
+        )
+
+    log4j2_configuration_files = [BASE_ENV["LOG4J_CONFIGURATION_FILE"]]
+    if config["job-logs-compressed"]:
+        log4j2_configuration_files = [LOG4J2_JOB_LOGS_PATH]
+        env.update(
+            {
+                "JOB_LOGS_LOCAL_MAX_SIZE_MB": config["job-logs-local-max-size-mb"],
+                "JOB_LOGS_UPLOAD_MAX_LINES": config["job-logs-upload-max-lines"],
+                # The burst filter's lines only become available again after the window.
+                "JOB_LOGS_UPLOAD_RATE": f"{config['job-logs-upload-max-lines'] / JOB_LOGS_UPLOAD_WINDOW:g}",
+                "JOB_LOGS_LEVEL": "INFO" if config["job-logs-drop-debug"] else "ALL",
+            }
+        )
+    if build_log4j2_overlay(config):
+        # Log4j2 merges the listed files: the charm's overlay only adds loggers.
+        log4j2_configuration_files.append(LOG4J2_OVERLAY_PATH)
+    env["LOG4J_CONFIGURATION_FILE"] = ",".join(log4j2_configuration_files)
+
+    if container_name in DATABASE_POOL_CONTAINERS:
+        pool_settings = get_database_pool_settings(config, container_name)
+        for datasource in DATABASE_POOL_DATASOURCES:
+            env.update(
+                {
+                    f"DATASOURCES_{datasource}_MAXIMUM_POOL_SIZE": pool_settings["max-size"],
+                    f"DATASOURCES_{datasource}_MINIMUM_IDLE": pool_settings["min-idle"],
+                    f"DATASOURCES_{datasource}_CONNECTION_TIMEOUT": pool_settings["connection-timeout-ms"],
+                }
+            )
+
     if otel_collector_endpoint:
         env.update(
             {
@@ -165,12 +254,15 @@ def create_env(
                 "OTEL_COLLECTOR_ENDPOINT": otel_collector_endpoint,
             }
         )
+        if container_name in TELEMETRY_CONTAINERS:
+            env.update(_get_metrics_export_env(config, container_name))
+            env.update(_get_otel_resource_env(model_name, app_name, container_name, unit_number))
 
     # https://github.com/airbytehq/airbyte/issues/29506#issuecomment-1775148609
     if container_name in ["airbyte-workload-launcher", "airbyte-workers", "airbyte-cron"]:
         env.update(
             {
-                "INTERNAL_API_HOST": f"http://{app_name}:{INTERNAL_API_PORT}",
+                "INTERNAL_API_HOST": f"http://{server_host}:{INTERNAL_API_PORT}",
                 "WORKLOAD_API_HOST": f"http://{app_name}:{WORKLOAD_API_PORT}",
             }
         )
@@ -237,9 +329,276 @@ def create_env(
             }
         )
 
+    if otel_traces_endpoint and config["tracing-enabled"] and container_name in TELEMETRY_CONTAINERS:
+        env.update(_get_otel_resource_env(model_name, app_name, container_name, unit_number))
+        env.update(_get_tracing_env(config, otel_traces_endpoint))
+        # Set only on the service itself: job pods run connector images without the agent.
+        env["JAVA_TOOL_OPTIONS"] = f"-javaagent:{OTEL_JAVA_AGENT_PATH} {env.get('JAVA_TOOL_OPTIONS', '')}".strip()
+
+    return env
+
+
+def get_database_pool_settings(config, container_name):
+    """Resolve the database connection pool settings of a service.
+
+    Args:
+        config: Charm config.
+        container_name: Name of Airbyte container.
+
+    Returns:
+        A dict with the "max-size", "min-idle" and "connection-timeout-ms"
+        settings, taking `database-pool-overrides` into account.
+    """
+    settings = {setting: config[config_name] for setting, config_name in DATABASE_POOL_SETTINGS.items()}
+    return _apply_service_overrides(config["database-pool-overrides"], container_name, settings)
+
+
+def get_metrics_export_settings(config, container_name):
+    """Resolve the Micrometer OTLP export settings of a service.
+
+    Args:
+        config: Charm config.
+        container_name: Name of Airbyte container.
+
+    Returns:
+        A dict with the "step-seconds" and "batch-size" settings, taking
+        `metrics-export-overrides` into account.
+    """
+    settings = {setting: config[config_name] for setting, config_name in METRICS_EXPORT_SETTINGS.items()}
+    return _apply_service_overrides(config["metrics-export-overrides"], container_name, settings)
+
+
+def _apply_service_overrides(overrides, container_name, settings):
+    """Apply the integer `<container>.<setting>=<value>` overrides of a service.
+
+    Args:
+        overrides: Comma-separated overrides, or None.
+        container_name: Name of Airbyte container.
+        settings: Default settings of the service, updated in place.
+
+    Returns:
+        The settings, with the service's overrides applied.
+    """
+    for item in (overrides or "").split(","):
+        key, _, value = item.partition("=")
+        override_container, _, setting = key.strip().rpartition(".")
+        if override_container == container_name and setting in settings:
+            settings[setting] = int(value)
+    return settings
+
+
+def get_metrics_disabled_binders(config, container_name):
+    """Return the Micronaut meter binders turned off for a service.
+
+    Args:
+        config: Charm config.
+        container_name: Name of Airbyte container.
+
+    Returns:
+        A sorted list of binder names, from both the entries applying to all
+        services and those scoped to this one in `metrics-disabled-binders`.
+    """
+    binders = set()
+    for item in _split_services(config["metrics-disabled-binders"]):
+        service, _, binder = item.rpartition(".")
+        if not service or service == container_name:
+            binders.add(binder)
+    return sorted(binders)
+
+
+def get_server_host(app_name, config):
+    """Return the Service host through which the Airbyte server is reached.
+
+    Args:
+        app_name: Name of the application.
+        config: Charm config.
+
+    Returns:
+        The readiness-gated server Service with `readiness-gated-service`, else
+        the application Service.
+    """
+    if config["readiness-gated-service"]:
+        return f"{app_name}-server"
+    return app_name
+
+
+def get_temporal_worker_ports(config):
+    """Return the port range of the Temporal workers.
+
+    Args:
+        config: Charm config.
+
+    Returns:
+        A range of ports.
+    """
+    start = config["temporal-worker-port-start"]
+    return range(start, start + config["temporal-worker-port-count"])
+
+
+def get_worker_concurrency(config):
+    """Return the number of jobs an airbyte-workers container may run at once.
+
+    Args:
+        config: Charm config.
+
+    Returns:
+        The sum of the max-*-workers settings.
+    """
+    return sum(config[config_name] or 0 for config_name in WORKER_CONCURRENCY_CONFIGS)
+
+
+def get_worker_task_queues(config, unit_number):
+    """Return the Temporal task queues the workers of a unit poll.
+
+    Args:
+        config: Charm config.
+        unit_number: Number of the unit.
+
+    Returns:
+        A list of task queue names, from `worker-task-queue-overrides` for this
+        unit or else `worker-task-queues`.
+    """
+    for item in _split_services(config["worker-task-queue-overrides"]):
+        unit, _, task_queues = item.partition("=")
+        if int(unit) == unit_number:
+            return task_queues.split("+")
+    return _split_services(config["worker-task-queues"])
+
+
+def get_database_pooler_services(config):
+    """Return the services configured to connect through the connection pooler.
+
+    Args:
+        config: Charm config.
+
+    Returns:
+        A list of container names.
+    """
+    return _split_services(config["database-pooler-services"])
+
+
+def _get_metrics_export_env(config, container_name):
+    """Generate the Micrometer OTLP export tuning of a service.
+
+    Args:
+        config: Charm config.
+        container_name: Name of Airbyte container.
+
+    Returns:
+        environment variables dict.
+    """
+    settings = get_metrics_export_settings(config, container_name)
+    env = {
+        "MICRONAUT_METRICS_EXPORT_OTLP_STEP": f"{settings['step-seconds']}s",
+        "MICRONAUT_METRICS_EXPORT_OTLP_BATCH_SIZE": settings["batch-size"],
+    }
+    for binder in get_metrics_disabled_binders(config, container_name):
+        env[f"MICRONAUT_METRICS_BINDERS_{binder.upper()}_ENABLED"] = "false"
     return env
 
 
+def _get_otel_resource_env(model_name, app_name, container_name, unit_number):
+    """Generate the OpenTelemetry resource identifying a service's metrics and traces.
+
+    Both Micrometer's OTLP registry and the Java agent read these, so each
+    service's series and spans carry its own service name (the `job` label)
+    and unit (the `instance` label).
+
+    Args:
+        model_name: Name of the juju model.
+        app_name: Name of the application.
+        container_name: Name of Airbyte container.
+        unit_number: Number of the unit running the service.
+
+    Returns:
+        environment variables dict.
+    """
+    return {
+        "OTEL_SERVICE_NAME": container_name,
+        "OTEL_RESOURCE_ATTRIBUTES": (
+            f"service.namespace={app_name},service.instance.id={app_name}/{unit_number},"
+            f"juju_model={model_name},juju_application={app_name}"
+        ),
+    }
+
+
+def _get_tracing_env(config, traces_endpoint):
+    """Generate the OpenTelemetry Java agent settings exporting a service's traces.
+
+    Args:
+        config: Charm config.
+        traces_endpoint: OTLP/HTTP traces endpoint of the collector.
+
+    Returns:
+        environment variables dict.
+    """
+    env = {
+        "OTEL_TRACES_EXPORTER": "otlp",
+        # Metrics are exported by Micrometer and logs are forwarded to Loki.
+        "OTEL_METRICS_EXPORTER": "none",
+        "OTEL_LOGS_EXPORTER": "none",
+        "OTEL_EXPORTER_OTLP_TRACES_PROTOCOL": "http/protobuf",
+        "OTEL_EXPORTER_OTLP_TRACES_ENDPOINT": traces_endpoint,
+        "OTEL_PROPAGATORS": "tracecontext,baggage",
+        "OTEL_TRACES_SAMPLER": "parentbased_traceidratio",
+        "OTEL_TRACES_SAMPLER_ARG": str(config["tracing-sample-ratio"]),
+    }
+    for instrumentation in _split_services(config["tracing-disabled-instrumentations"]):
+        # The agent reads "otel.instrumentation.<name>.enabled" with dots and dashes as "_".
+        env[f"OTEL_INSTRUMENTATION_{re.sub(r'[^A-Z0-9]', '_', instrumentation.upper())}_ENABLED"] = "false"
+    return env
+
+
+def _split_services(value):
+    """Split a comma-separated list of services from the config.
+
+    Args:
+        value: the comma-separated services string, or None.
+
+    Returns:
+        A list of container names.
+    """
+    return [service.strip() for service in (value or "").split(",") if service.strip()]
+
+
+def _get_jdbc_url(endpoints, db_name, params):
+    """Build a PostgreSQL JDBC URL.
+
+    Args:
+        endpoints: "host:port" endpoints; several make a multi-host URL.
+        db_name: the database name.
+        params: connection parameters appended as the query string.
+
+    Returns:
+        The JDBC URL.
+    """
+    url = f"jdbc:postgresql://{','.join(endpoints)}/{db_name}"
+    if params:
+        url += "?" + "&".join(f"{key}={value}" for key, value in params.items())
+    return url
+
+
+def get_database_connection_budget(config, units, pooled=False):
+    """Compute the maximum number of database connections the application may open.
+
+    Args:
+        config: Charm config.
+        units: Number of units of the application.
+        pooled: Whether a connection pooler is in use, in which case the pools of
+            the services connecting through it are not counted.
+
+    Returns:
+        The number of connections all pools of all units can open together.
+    """
+    pooler_services = get_database_pooler_services(config) if pooled else []
+    per_unit = sum(
+        get_database_pool_settings(config, container_name)["max-size"] * len(DATABASE_POOL_DATASOURCES)
+        for container_name in DATABASE_POOL_CONTAINERS
+        if container_name not in pooler_services
+    )
+    return per_unit * units
+
+
 def _get_java_tool_options(http_proxy, https_proxy, no_proxy):
     """Generate Java tool options for configuring HTTP and HTTPS proxies.
 
@@ -0,0 +1,232 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Charm operational metrics, pushed over OTLP/HTTP."""
+
+import json
+import logging
+import time
+from collections.abc import Mapping, MutableSequence
+from contextlib import contextmanager
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+from literals import CHARM_METRICS_DURATION_BOUNDS, CHARM_METRICS_EXPORT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# OTLP AGGREGATION_TEMPORALITY_CUMULATIVE.
+CUMULATIVE = 2
+
+
+class CharmMetrics:
+    """Records the charm's own metrics and pushes them to an OTLP/HTTP collector.
+
+    A charm process lives for a single dispatch, so the running totals are kept
+    in stored state and every push reports cumulative counters and duration
+    histograms, as Prometheus expects.
+
+    Attrs:
+        totals: the cumulative series recorded so far, keyed by name and attributes.
+    """
+
+    def __init__(self, stored, resource_attributes):
+        """Construct.
+
+        Args:
+            stored: the charm's StoredState, holding the totals across dispatches.
+            resource_attributes: attributes identifying the unit the metrics come from.
+        """
+        self._stored = stored
+        self._stored.set_default(metrics={}, metrics_start=time.time_ns())
+        self._resource_attributes = resource_attributes
+        self._pending = []
+
+    @property
+    def totals(self):
+        """Return the cumulative series recorded so far.
+
+        Returns:
+            A dict of series keyed by name and attributes.
+        """
+        return _plain(self._stored.metrics)
+
+    def increment(self, name, value=1, **attributes):
+        """Add to a counter.
+
+        Args:
+            name: the metric name.
+            value: the amount to add.
+            attributes: the series attributes.
+        """
+        self._pending.append(("sum", name, attributes, value))
+
+    def observe(self, name, seconds, **attributes):
+        """Record a duration in a histogram.
+
+        Args:
+            name: the metric name.
+            seconds: the duration to record.
+            attributes: the series attributes.
+        """
+        self._pending.append(("histogram", name, attributes, seconds))
+
+    @contextmanager
+    def timer(self, name, **attributes):
+        """Time the enclosed block into a duration histogram.
+
+        Args:
+            name: the metric name.
+            attributes: the series attributes.
+
+        Yields:
+            Nothing; the block's duration is recorded on exit, even on error.
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start, **attributes)
+
+    def flush(self, endpoint):
+        """Fold this dispatch's measurements into the totals and push them.
+
+        Failures to push are logged only: metrics must never fail a hook.
+
+        Args:
+            endpoint: the collector's OTLP/HTTP metrics endpoint, or None to only
+                keep the totals.
+        """
+        totals = self.totals
+        for kind, name, attributes, value in self._pending:
+            key = json.dumps([name, sorted(attributes.items())])
+            series = totals.setdefault(key, _new_series(kind, name, attributes))
+            series["value"] += value
+            if kind == "histogram":
+                series["buckets"][_bucket_index(value)] += 1
+                series["count"] += 1
+        self._pending = []
+        self._stored.metrics = totals
+
+        if not endpoint or not totals:
+            return
+        request = Request(
+            endpoint,
+            data=json.dumps(self._build_request(totals)).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urlopen(request, timeout=CHARM_METRICS_EXPORT_TIMEOUT):  # nosec
+                pass
+        except (URLError, OSError) as err:
+            logger.warning("Failed to push charm metrics to %s: %s", endpoint, err)
+
+    def _build_request(self, totals):
+        """Build the OTLP ExportMetricsServiceRequest, in its JSON encoding.
+
+        Args:
+            totals: the cumulative series to export.
+
+        Returns:
+            The request body dict.
+        """
+        start = str(self._stored.metrics_start)
+        now = str(time.time_ns())
+        metrics = {}
+        for series in totals.values():
+            point = {
+                "attributes": _attributes(series["attributes"]),
+                "startTimeUnixNano": start,
+                "timeUnixNano": now,
+            }
+            if series["kind"] == "sum":
+                point["asDouble"] = series["value"]
+                metric = metrics.setdefault(
+                    series["name"],
+                    {"name": series["name"], "sum": {"aggregationTemporality": CUMULATIVE, "isMonotonic": True}},
+                )
+                metric["sum"].setdefault("dataPoints", []).append(point)
+            else:
+                point.update(
+                    {
+                        "count": str(series["count"]),
+                        "sum": series["value"],
+                        "bucketCounts": [str(count) for count in series["buckets"]],
+                        "explicitBounds": list(CHARM_METRICS_DURATION_BOUNDS),
+                    }
+                )
+                metric = metrics.setdefault(
+                    series["name"],
+                    {"name": series["name"], "unit": "s", "histogram": {"aggregationTemporality": CUMULATIVE}},
+                )
+                metric["histogram"].setdefault("dataPoints", []).append(point)
+
+        return {
+            "resourceMetrics": [
+                {
+                    "resource": {"attributes": _attributes(self._resource_attributes)},
+                    "scopeMetrics": [{"scope": {"name": "airbyte-k8s-charm"}, "metrics": list(metrics.values())}],
+                }
+            ]
+        }
+
+
+def _new_series(kind, name, attributes):
+    """Create an empty series.
+
+    Args:
+        kind: "sum" or "histogram".
+        name: the metric name.
+        attributes: the series attributes.
+
+    Returns:
+        The series dict, made of plain types so it can be stored.
+    """
+    series = {"kind": kind, "name": name, "attributes": dict(attributes), "value": 0}
+    if kind == "histogram":
+        series.update({"count": 0, "buckets": [0] * (len(CHARM_METRICS_DURATION_BOUNDS) + 1)})
+    return series
+
+
+def _bucket_index(seconds):
+    """Return the index of the histogram bucket a duration falls into.
+
+    Args:
+        seconds: the duration.
+
+    Returns:
+        The bucket index; the last bucket is unbounded.
+    """
+    for index, bound in enumerate(CHARM_METRICS_DURATION_BOUNDS):
+        if seconds <= bound:
+            return index
+    return len(CHARM_METRICS_DURATION_BOUNDS)
+
+
+def _attributes(attributes):
+    """Encode attributes as OTLP key-values.
+
+    Args:
+        attributes: the attribute mapping.
+
+    Returns:
+        A list of OTLP KeyValue dicts.
+    """
+    return [{"key": key, "value": {"stringValue": str(value)}} for key, value in sorted(attributes.items())]
+
+
+def _plain(value):
+    """Copy stored state values into plain dicts and lists.
+
+    Args:
+        value: a value read from stored state.
+
+    Returns:
+        The same value made of plain, mutable types.
+    """
+    if isinstance(value, Mapping):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (MutableSequence, tuple)):
+        return [_plain(item) for item in value]
+    return value
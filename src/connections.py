@@ -16,6 +16,7 @@ class DatabaseConnection:
         port: the database port.
         user: the database username, if provided.
         password: the database password, if provided.
+        endpoints: all "host:port" endpoints of the primary, in failover order.
     """
 
     dbname: str
@@ -23,6 +24,7 @@ class DatabaseConnection:
     port: str
     user: str | None
     password: str | None
+    endpoints: tuple[str, ...] = ()
 
 
 @dataclass(frozen=True)
@@ -75,12 +77,14 @@ class ReconcileData:
 
     Attrs:
         db: the database connection details.
+        db_pooler: the connection pooler details, or None when not configured.
         minio: the object-storage details, or None when not configured.
         s3: the S3 details, or None when not configured.
         credentials: credentials resolved from Juju secrets (empty if none).
     """
 
     db: DatabaseConnection
+    db_pooler: DatabaseConnection | None
     minio: ObjectStorageConnection | None
     s3: S3Connection | None
     credentials: dict[str, str]
@@ -0,0 +1,108 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Job history retention helpers."""
+
+import logging
+import time
+from dataclasses import dataclass
+
+from connections import DatabaseConnection
+
+logger = logging.getLogger(__name__)
+
+# Deletes one batch of finished jobs older than the cutoff, together with their
+# attempts and attempt statistics, in a single statement (and transaction). The
+# most recent job of each scope (connection) is kept since Airbyte derives the
+# connection status from it.
+PURGE_BATCH_SQL = """
+WITH doomed_jobs AS (
+    SELECT id FROM jobs
+    WHERE updated_at < now() - make_interval(days => {older_than_days})
+      AND status IN ('succeeded', 'failed', 'cancelled')
+      AND EXISTS (SELECT 1 FROM jobs newer WHERE newer.scope = jobs.scope AND newer.id > jobs.id)
+    ORDER BY id
+    LIMIT {batch_size}
+),
+doomed_attempts AS (
+    SELECT id FROM attempts WHERE job_id IN (SELECT id FROM doomed_jobs)
+),
+deleted_sync_stats AS (
+    DELETE FROM sync_stats WHERE attempt_id IN (SELECT id FROM doomed_attempts)
+),
+deleted_stream_stats AS (
+    DELETE FROM stream_stats WHERE attempt_id IN (SELECT id FROM doomed_attempts)
+),
+deleted_attempts AS (
+    DELETE FROM attempts WHERE id IN (SELECT id FROM doomed_attempts) RETURNING id
+),
+deleted_jobs AS (
+    DELETE FROM jobs WHERE id IN (SELECT id FROM doomed_jobs) RETURNING id
+)
+SELECT (SELECT count(*) FROM deleted_jobs), (SELECT count(*) FROM deleted_attempts);
+"""
+
+
+@dataclass(frozen=True)
+class PurgeResult:
+    """Outcome of a job history purge.
+
+    Attrs:
+        jobs: number of jobs removed.
+        attempts: number of attempts removed.
+        batches: number of batches run.
+        duration: time taken, in seconds.
+    """
+
+    jobs: int
+    attempts: int
+    batches: int
+    duration: float
+
+
+def purge_job_history(container, db_connection: DatabaseConnection, older_than_days, batch_size, max_batches):
+    """Purge finished jobs older than the given age, in bounded batches.
+
+    Each batch runs through `psql` in the given workload container and commits
+    on its own, so locks are held only for one batch at a time. Purging stops
+    once a batch removes fewer jobs than the batch size or `max_batches` ran.
+
+    Args:
+        container: the workload container to run `psql` in.
+        db_connection: the database connection details.
+        older_than_days: minimum age, in days, of the jobs to remove.
+        batch_size: maximum number of jobs removed per batch.
+        max_batches: maximum number of batches to run.
+
+    Returns:
+        A PurgeResult with the rows removed and the time taken.
+
+    Raises:
+        ops.pebble.Error: if psql cannot be run or fails.
+    """
+    sql = PURGE_BATCH_SQL.format(older_than_days=int(older_than_days), batch_size=int(batch_size))  # nosec
+    environment = {
+        "PGHOST": db_connection.host,
+        "PGPORT": str(db_connection.port),
+        "PGDATABASE": db_connection.dbname,
+        "PGUSER": db_connection.user or "",
+        "PGPASSWORD": db_connection.password or "",
+    }
+
+    jobs = attempts = batches = 0
+    start = time.monotonic()
+    while batches < max_batches:
+        process = container.exec(
+            ["psql", "-X", "-q", "-t", "-A", "-v", "ON_ERROR_STOP=1", "-c", sql],
+            environment=environment,
+        )
+        stdout, _ = process.wait_output()
+        batch_jobs, batch_attempts = (int(count) for count in stdout.strip().split("|"))
+        jobs += batch_jobs
+        attempts += batch_attempts
+        batches += 1
+        logger.info("Purged %d jobs and %d attempts in batch %d", batch_jobs, batch_attempts, batches)
+        if batch_jobs < batch_size:
+            break
+
+    return PurgeResult(jobs=jobs, attempts=attempts, batches=batches, duration=time.monotonic() - start)
@@ -0,0 +1,254 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Kubernetes helpers."""
+
+import logging
+
+from literals import (
+    IMAGE_PREPULL_PAUSE_IMAGE,
+    IMAGE_PREPULL_TOOLS_IMAGE,
+    SERVER_READY_LABEL,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_key_value_pairs(value):
+    """Parse a "key1=value1,key2=value2" config string into a dict.
+
+    Args:
+        value: the comma-separated k=v string, or None.
+
+    Returns:
+        A dict of the parsed pairs; empty if the value is unset.
+    """
+    pairs = {}
+    for item in (value or "").split(","):
+        if not item.strip():
+            continue
+        key, _, val = item.partition("=")
+        pairs[key.strip()] = val.strip()
+    return pairs
+
+
+def parse_tolerations(value):
+    """Parse the `job-kube-tolerations` config string into pod tolerations.
+
+    Tolerations are separated by ';' and each one is a set of k=v pairs
+    separated by ','.
+
+    Args:
+        value: the tolerations string, or None.
+
+    Returns:
+        A list of toleration dicts in Kubernetes pod spec form.
+    """
+    tolerations = []
+    for item in (value or "").split(";"):
+        toleration = parse_key_value_pairs(item)
+        if toleration:
+            tolerations.append(toleration)
+    return tolerations
+
+
+def build_prepull_daemonset(
+    name, namespace, images, node_selector=None, tolerations=None, pull_secret=None, tools_image=None
+):
+    """Build a DaemonSet manifest that pre-pulls the given images on every matching node.
+
+    Each image is pulled by an init container that exits immediately; the pod
+    then idles on the pause image so the images stay cached on the node. Since
+    the images need not ship a shell, the init containers run a static `true`
+    binary copied from the tools (busybox) image into a shared volume.
+
+    Args:
+        name: name of the DaemonSet.
+        namespace: namespace to create the DaemonSet in.
+        images: images to pre-pull.
+        node_selector: optional node selector restricting the nodes.
+        tolerations: optional pod tolerations.
+        pull_secret: optional image pull secret name.
+        tools_image: optional busybox image providing the `true` binary.
+
+    Returns:
+        The DaemonSet manifest dict.
+    """
+    labels = {"app.kubernetes.io/name": name, "app.kubernetes.io/managed-by": "airbyte-k8s"}
+    resources = {"requests": {"cpu": "10m", "memory": "16Mi"}}
+    volume_mounts = [{"name": "prepull-tools", "mountPath": "/prepull"}]
+    init_containers = [
+        {
+            "name": "prepull-tools",
+            "image": tools_image or IMAGE_PREPULL_TOOLS_IMAGE,
+            "imagePullPolicy": "IfNotPresent",
+            "command": ["cp", "/bin/true", "/prepull/true"],
+            "resources": resources,
+            "volumeMounts": volume_mounts,
+        }
+    ]
+    init_containers.extend(
+        {
+            "name": f"prepull-{index}",
+            "image": image,
+            "imagePullPolicy": "IfNotPresent",
+            "command": ["/prepull/true"],
+            "resources": resources,
+            "volumeMounts": volume_mounts,
+        }
+        for index, image in enumerate(images)
+    )
+    pod_spec = {
+        "initContainers": init_containers,
+        "volumes": [{"name": "prepull-tools", "emptyDir": {}}],
+        "containers": [
+            {
+                "name": "pause",
+                "image": IMAGE_PREPULL_PAUSE_IMAGE,
+                "resources": {"requests": {"cpu": "1m", "memory": "8Mi"}},
+            }
+        ],
+        "terminationGracePeriodSeconds": 0,
+    }
+    if node_selector:
+        pod_spec["nodeSelector"] = node_selector
+    if tolerations:
+        pod_spec["tolerations"] = tolerations
+    if pull_secret:
+        pod_spec["imagePullSecrets"] = [{"name": pull_secret}]
+
+    return {
+        "apiVersion": "apps/v1",
+        "kind": "DaemonSet",
+        "metadata": {"name": name, "namespace": namespace, "labels": labels},
+        "spec": {
+            "selector": {"matchLabels": labels},
+            "template": {"metadata": {"labels": labels}, "spec": pod_spec},
+        },
+    }
+
+
+def apply_daemonset(apps_client, manifest):
+    """Create the DaemonSet, or replace it if it already exists.
+
+    Replacing rather than patching drops the images, node selectors and pull
+    secrets removed from the manifest, which a strategic merge patch would keep.
+
+    Args:
+        apps_client: a kubernetes AppsV1Api client.
+        manifest: the DaemonSet manifest dict.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from kubernetes.client.exceptions import ApiException
+
+    name = manifest["metadata"]["name"]
+    namespace = manifest["metadata"]["namespace"]
+    try:
+        apps_client.replace_namespaced_daemon_set(name, namespace, manifest)
+        logger.info("Replaced DaemonSet %r in namespace %r", name, namespace)
+    except ApiException as err:
+        if err.status != 404:
+            raise
+        apps_client.create_namespaced_daemon_set(namespace, manifest)
+        logger.info("Created DaemonSet %r in namespace %r", name, namespace)
+
+
+def delete_daemonset(apps_client, name, namespace):
+    """Delete the DaemonSet if it exists.
+
+    Args:
+        apps_client: a kubernetes AppsV1Api client.
+        name: name of the DaemonSet.
+        namespace: namespace of the DaemonSet.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from kubernetes.client.exceptions import ApiException
+
+    try:
+        apps_client.delete_namespaced_daemon_set(name, namespace)
+        logger.info("Deleted DaemonSet %r in namespace %r", name, namespace)
+    except ApiException as err:
+        if err.status != 404:
+            raise
+
+
+def build_server_service(name, namespace, app_name, ports):
+    """Build a Service manifest selecting only the units with a ready Airbyte server.
+
+    Args:
+        name: name of the Service.
+        namespace: namespace of the Service.
+        app_name: name of the application, whose pods the Service selects.
+        ports: the Airbyte server ports to expose.
+
+    Returns:
+        The Service manifest dict.
+    """
+    return {
+        "apiVersion": "v1",
+        "kind": "Service",
+        "metadata": {
+            "name": name,
+            "namespace": namespace,
+            "labels": {"app.kubernetes.io/name": name, "app.kubernetes.io/managed-by": "airbyte-k8s"},
+        },
+        "spec": {
+            "selector": {"app.kubernetes.io/name": app_name, SERVER_READY_LABEL: "true"},
+            "ports": [{"name": f"port-{port}", "port": port, "targetPort": port} for port in ports],
+        },
+    }
+
+
+def apply_service(core_client, manifest):
+    """Create the Service, or patch it in place if it already exists.
+
+    Args:
+        core_client: a kubernetes CoreV1Api client.
+        manifest: the Service manifest dict.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from kubernetes.client.exceptions import ApiException
+
+    name = manifest["metadata"]["name"]
+    namespace = manifest["metadata"]["namespace"]
+    try:
+        core_client.patch_namespaced_service(name, namespace, manifest)
+        logger.info("Patched Service %r in namespace %r", name, namespace)
+    except ApiException as err:
+        if err.status != 404:
+            raise
+        core_client.create_namespaced_service(namespace, manifest)
+        logger.info("Created Service %r in namespace %r", name, namespace)
+
+
+def delete_service(core_client, name, namespace):
+    """Delete the Service if it exists.
+
+    Args:
+        core_client: a kubernetes CoreV1Api client.
+        name: name of the Service.
+        namespace: namespace of the Service.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from kubernetes.client.exceptions import ApiException
+
+    try:
+        core_client.delete_namespaced_service(name, namespace)
+        logger.info("Deleted Service %r in namespace %r", name, namespace)
+    except ApiException as err:
+        if err.status != 404:
+            raise
+
+
+def set_server_ready_label(core_client, pod_name, namespace, ready):
+    """Label a unit's pod with the readiness of its Airbyte server.
+
+    Args:
+        core_client: a kubernetes CoreV1Api client.
+        pod_name: name of the unit's pod.
+        namespace: namespace of the pod.
+        ready: whether the server passes its health check.
+    """
+    core_client.patch_namespaced_pod(
+        pod_name, namespace, {"metadata": {"labels": {SERVER_READY_LABEL: str(ready).lower()}}}
+    )
@@ -8,10 +8,86 @@ INTERNAL_API_PORT = 8001
 AIRBYTE_API_PORT = 8006
 WORKLOAD_API_PORT = 8007
 WORKLOAD_LAUNCHER_PORT = 8016
+CONNECTOR_REGISTRY_MIRROR_PORT = 8090
+AIRBYTE_WORKERS_HEALTH_PORT = 9000
 AIRBYTE_VERSION = "1.7.0"
 DB_NAME = "airbyte-k8s_db"
 AIRBYTE_AUTH_K8S_SECRET_NAME = "airbyte-auth-secrets"  # nosec
+IMAGE_PREPULL_PAUSE_IMAGE = "registry.k8s.io/pause:3.9"
+IMAGE_PREPULL_TOOLS_IMAGE = "busybox:1.36"
 
+LOKI_ALERT_RULES_PATH = "src/loki_alert_rules"
+PROMETHEUS_ALERT_RULES_PATH = "src/prometheus_alert_rules"
+
+# Upper bounds, in seconds, of the charm's own duration histograms, and the
+# timeout of pushing them to the collector.
+CHARM_METRICS_DURATION_BOUNDS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120]
+CHARM_METRICS_EXPORT_TIMEOUT = 2
+
+# Paths of the Log4j2 configurations the charm pushes into the workload containers:
+# the logger overlay and the compressed job logs configuration (shipped in the charm).
+LOG4J2_OVERLAY_PATH = "/etc/airbyte/log4j2-charm.xml"
+LOG4J2_JOB_LOGS_PATH = "/etc/airbyte/log4j2-job-logs.xml"
+LOG4J2_JOB_LOGS_SOURCE = "src/log4j2/log4j2-job-logs.xml"
+# Seconds over which the job log lines uploaded for an attempt are counted
+# against `job-logs-upload-max-lines`: longer than any attempt runs.
+JOB_LOGS_UPLOAD_WINDOW = 86400
+
+# Local mirror of the connector registry and stubs: served over localhost (shared
+# by all containers of the pod) from a directory of the airbyte-server container.
+CONNECTOR_REGISTRY_MIRROR_SERVICE = "connector-registry-mirror"
+CONNECTOR_REGISTRY_MIRROR_CONTAINER = "airbyte-server"
+CONNECTOR_REGISTRY_MIRROR_DIR = "/var/lib/airbyte/connector-registry"
+CONNECTOR_REGISTRY_FILES = [
+    "registries/v0/oss_registry.json",
+    "resources/connector_stubs/v0/connector_stubs.json",
+]
+CONNECTOR_REGISTRY_FETCH_TIMEOUT = 30
+# Minimum interval, in seconds, between reconciles retrying to populate an empty
+# mirror, so that an unreachable source does not slow every hook down.
+CONNECTOR_REGISTRY_FETCH_RETRY_INTERVAL = 3600
+
+# Pebble custom notice the bootloader service records once it has completed (and
+# created the airbyte-auth-secrets secret), with the pebble binary Juju mounts in
+# every workload container.
+BOOTLOADER_COMPLETED_NOTICE = "airbyte.io/bootloader-completed"
+PEBBLE_PATH = "/charm/bin/pebble"
+
+# Peer application data key holding the Airbyte version the database was last
+# migrated to by a bootloader.
+MIGRATED_VERSION_KEY = "migrated-version"
+
+# Peer data keys of the rolling restart lock: the units holding it (application
+# data) and a unit's request for it (unit data).
+RESTART_LOCK_KEY = "restart-lock"
+RESTART_REQUESTED_KEY = "restart-requested"
+
+# Peer application data key holding the namespace the leader applied the image
+# pre-pull DaemonSet in, so that it is only deleted once it exists.
+IMAGE_PREPULL_NAMESPACE_KEY = "image-prepull-namespace"
+
+# Pod label tracking the readiness of a unit's Airbyte server, selected by the
+# readiness-gated server Service, and the ports that Service exposes.
+SERVER_READY_LABEL = "airbyte.io/server-ready"
+SERVER_SERVICE_PORTS = [INTERNAL_API_PORT, AIRBYTE_API_PORT]
+
+# Peer application data key flagging that the leader applied the server Service,
+# so that it is only deleted once it exists.
+SERVER_SERVICE_KEY = "server-service"
+
+# Services claiming workloads, stopped in this order on drain: the launcher stops
+# claiming workloads before the workers stop polling Temporal. A drained unit is
+# flagged in its peer unit data so that reconciling does not restart them.
+DRAIN_CONTAINERS = ["airbyte-workload-launcher", "airbyte-workers"]
+DRAINED_KEY = "drained"
+
+# Kubernetes' default pod termination grace period, in seconds, assumed when the
+# pod's own cannot be read, and the part of it left for the rest of the stop hook.
+TERMINATION_GRACE_PERIOD_DEFAULT = 30
+TERMINATION_GRACE_PERIOD_MARGIN = 5
+
+# Path of the OpenTelemetry Java agent shipped in the rock.
+OTEL_JAVA_AGENT_PATH = "/opt/opentelemetry/opentelemetry-javaagent.jar"
 
 CONTAINER_HEALTH_CHECK_MAP = {
     "airbyte-workload-api-server": {
@@ -33,9 +109,73 @@ CONTAINER_HEALTH_CHECK_MAP = {
         "port": INTERNAL_API_PORT,
         "health_endpoint": "/api/v1/health",
     },
-    "airbyte-workers": {"port": 9000, "health_endpoint": "/"},
+    "airbyte-workers": {"port": AIRBYTE_WORKERS_HEALTH_PORT, "health_endpoint": "/"},
 }
 
+# Order in which staged startup brings up the runtime services: each stage starts
+# once the previous one is healthy. The bootloader runs ahead of all of them.
+STARTUP_STAGES = [
+    ["airbyte-server", "airbyte-workload-api-server"],
+    ["airbyte-workload-launcher", "airbyte-workers"],
+    ["airbyte-cron", "airbyte-connector-builder-server", "airbyte-pod-sweeper"],
+]
+
+# Java services exporting metrics and traces over OTLP (the pod sweeper is a
+# shell script).
+TELEMETRY_CONTAINERS = [name for name in CONTAINER_HEALTH_CHECK_MAP if name != "airbyte-pod-sweeper"]
+
+# Ports the Temporal worker port range must not overlap, and the worker types
+# whose concurrent jobs each hold one of its ports.
+RESERVED_PORTS = [
+    CONNECTOR_BUILDER_SERVER_API_PORT,
+    INTERNAL_API_PORT,
+    AIRBYTE_API_PORT,
+    WORKLOAD_API_PORT,
+    WORKLOAD_LAUNCHER_PORT,
+    CONNECTOR_REGISTRY_MIRROR_PORT,
+    AIRBYTE_WORKERS_HEALTH_PORT,
+]
+WORKER_CONCURRENCY_CONFIGS = ["max-spec-workers", "max-check-workers", "max-sync-workers", "max-discover-workers"]
+
+# Temporal task queues the airbyte-workers containers can poll, mapped to the
+# setting turning their workflows on.
+WORKER_TASK_QUEUES = {
+    "spec": "SHOULD_RUN_GET_SPEC_WORKFLOWS",
+    "check": "SHOULD_RUN_CHECK_CONNECTION_WORKFLOWS",
+    "discover": "SHOULD_RUN_DISCOVER_WORKFLOWS",
+    "sync": "SHOULD_RUN_SYNC_WORKFLOWS",
+    "connection-manager": "SHOULD_RUN_CONNECTION_MANAGER_WORKFLOWS",
+    "notify": "SHOULD_RUN_NOTIFY_WORKFLOWS",
+}
+
+# Micrometer OTLP export settings which can be overridden per service, mapped to
+# their default config option, and the Micronaut meter binders which can be
+# turned off to cut the exported series.
+METRICS_EXPORT_SETTINGS = {
+    "step-seconds": "metrics-export-step-seconds",
+    "batch-size": "metrics-export-batch-size",
+}
+METRICS_BINDERS = ["cache", "executor", "files", "jdbc", "jvm", "logback", "processor", "uptime", "web"]
+
+# Services holding Hikari connection pools against the Airbyte database, and the
+# Micronaut datasources each of them opens (one pool per datasource).
+DATABASE_POOL_CONTAINERS = [
+    "airbyte-bootloader",
+    "airbyte-cron",
+    "airbyte-server",
+    "airbyte-workers",
+    "airbyte-workload-api-server",
+]
+DATABASE_POOL_DATASOURCES = ["CONFIG", "JOBS"]
+DATABASE_POOL_SETTINGS = {
+    "max-size": "database-pool-max-size",
+    "min-idle": "database-pool-min-idle",
+    "connection-timeout-ms": "database-pool-connection-timeout-ms",
+}
+
+# Batches run by the scheduled job history purge per update-status, keeping the hook short.
+JOB_HISTORY_PURGE_MAX_BATCHES = 10
+
 BUCKET_CONFIGS = [
     "storage-bucket-logs",
     "storage-bucket-state",
@@ -44,6 +184,18 @@ BUCKET_CONFIGS = [
 ]
 LOGS_BUCKET_CONFIG = "storage-bucket-logs"
 
+# Images pulled by every job pod, pre-pulled on job nodes when `image-prepull-enabled` is set.
+IMAGE_PREPULL_CONFIGS = [
+    "job-kube-socat-image",
+    "job-kube-busybox-image",
+    "job-kube-curl-image",
+]
+IMAGE_PREPULL_BASE_ENV_KEYS = [
+    "CONTAINER_ORCHESTRATOR_IMAGE",
+    "CONNECTOR_SIDECAR_IMAGE",
+    "WORKLOAD_INIT_IMAGE",
+]
+
 BASE_ENV = {
     "API_URL": "/api/v1/",
     "AIRBYTE_VERSION": AIRBYTE_VERSION,
@@ -61,9 +213,7 @@ BASE_ENV = {
     "LAUNCHER_MICRONAUT_ENVIRONMENTS": "control-plane,oss",
     "KEYCLOAK_INTERNAL_HOST": "localhost",
     "WORKER_ENVIRONMENT": "kubernetes",
-    "SHOULD_RUN_NOTIFY_WORKFLOWS": "true",
     "CONNECTOR_BUILDER_API_URL": "/connector-builder-api",
-    "TEMPORAL_WORKER_PORTS": "9001,9002,9003,9004,9005,9006,9007,9008,9009,9010,9011,9012,9013,9014,9015,9016,9017,9018,9019,9020,9021,9022,9023,9024,9025,9026,9027,9028,9029,9030",
     "CONTAINER_ORCHESTRATOR_ENABLED": "true",
     "CONTAINER_ORCHESTRATOR_IMAGE": f"airbyte/container-orchestrator:{AIRBYTE_VERSION}",
     "CONNECTOR_PROFILER_IMAGE": f"airbyte/async-profiler:{AIRBYTE_VERSION}",
@@ -75,7 +225,6 @@ BASE_ENV = {
     "PUB_SUB_TOPIC_NAME": "",
     "DATA_PLANE_ID": "local",
     "LOCAL_ROOT": "/tmp/airbyte_local",  # nosec
-    "RUN_DATABASE_MIGRATION_ON_STARTUP": "true",
     "API_AUTHORIZATION_ENABLED": "false",
     "DATAPLANE_CLIENT_ID_SECRET_NAME": "airbyte-auth-secrets",
     "DATAPLANE_CLIENT_ID_SECRET_KEY": "dataplane-client-id",
@@ -0,0 +1,64 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Log4j2 configuration helpers."""
+
+import xml.etree.ElementTree as ET  # nosec
+
+from k8s_helpers import parse_key_value_pairs
+
+# Log4j2 spells the config's WARNING level WARN.
+LOG4J2_LEVELS = {"WARNING": "WARN"}
+
+# Lines per second above which a rate-limited logger starts dropping lines, as a
+# multiple of its rate; ERROR and FATAL lines are never dropped.
+BURST_FACTOR = 10
+BURST_FILTER_LEVEL = "WARN"
+
+
+def get_log_level(config, container_name):
+    """Resolve the log level of a service.
+
+    Args:
+        config: Charm config.
+        container_name: Name of Airbyte container.
+
+    Returns:
+        The level from `log-level-overrides`, or the global `log-level`.
+    """
+    overrides = parse_key_value_pairs(config["log-level-overrides"])
+    return overrides.get(container_name, config["log-level"].value)
+
+
+def build_log4j2_overlay(config):
+    """Build the Log4j2 configuration merged over the image's own one.
+
+    Log4j2 merges the files listed in LOG4J_CONFIGURATION_FILE, so this only
+    declares loggers: their levels from `log-logger-levels` and a BurstFilter
+    for the ones rate-limited by `log-rate-limits`.
+
+    Args:
+        config: Charm config.
+
+    Returns:
+        The configuration XML, or None when no logger is configured.
+    """
+    levels = parse_key_value_pairs(config["log-logger-levels"])
+    rate_limits = parse_key_value_pairs(config["log-rate-limits"])
+    if not levels and not rate_limits:
+        return None
+
+    root = ET.Element("Configuration")
+    loggers = ET.SubElement(root, "Loggers")
+    for name in sorted(set(levels) | set(rate_limits)):
+        logger = ET.SubElement(loggers, "Logger", name=name)
+        if name in levels:
+            logger.set("level", LOG4J2_LEVELS.get(levels[name], levels[name]))
+        if name in rate_limits:
+            rate = int(rate_limits[name])
+            ET.SubElement(
+                logger, "BurstFilter", level=BURST_FILTER_LEVEL, rate=str(rate), maxBurst=str(rate * BURST_FACTOR)
+            )
+
+    ET.indent(root)
+    return '<?xml version="1.0" encoding="UTF-8"?>\n' + ET.tostring(root, encoding="unicode") + "\n"
@@ -0,0 +1,91 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Local mirror of the connector registry and stubs."""
+
+import json
+import logging
+import os
+import urllib.request
+
+from literals import (
+    CONNECTOR_REGISTRY_FETCH_TIMEOUT,
+    CONNECTOR_REGISTRY_FILES,
+    CONNECTOR_REGISTRY_MIRROR_DIR,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_registry(source_url):
+    """Download the connector registry and stubs from the given base URL.
+
+    The charm's Juju proxy settings are honoured.
+
+    Args:
+        source_url: base URL laid out like https://connectors.airbyte.com/files.
+
+    Returns:
+        A dict of the downloaded files, keyed by their path under the base URL.
+
+    Raises:
+        ValueError: if a file cannot be downloaded or is not valid JSON.
+    """
+    proxies = {
+        scheme: proxy
+        for scheme, proxy in (
+            ("http", os.environ.get("JUJU_CHARM_HTTP_PROXY")),
+            ("https", os.environ.get("JUJU_CHARM_HTTPS_PROXY")),
+        )
+        if proxy
+    }
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler(proxies))
+
+    files = {}
+    for path in CONNECTOR_REGISTRY_FILES:
+        url = f"{source_url.rstrip('/')}/{path}"
+        try:
+            with opener.open(url, timeout=CONNECTOR_REGISTRY_FETCH_TIMEOUT) as response:  # nosec
+                content = response.read()
+            json.loads(content)
+        except (OSError, ValueError) as err:
+            raise ValueError(f"failed to fetch {url}: {err}") from err
+        files[path] = content
+        logger.info("Fetched %s (%d bytes)", url, len(content))
+    return files
+
+
+def push_registry(container, files):
+    """Write the registry files into the mirror directory of a container.
+
+    Args:
+        container: the container serving the mirror.
+        files: the files returned by fetch_registry.
+    """
+    for path, content in files.items():
+        container.push(f"{CONNECTOR_REGISTRY_MIRROR_DIR}/{path}", content, make_dirs=True)
+
+
+def is_registry_mirrored(container):
+    """Check whether the mirror directory of a container holds every registry file.
+
+    Args:
+        container: the container serving the mirror.
+
+    Returns:
+        True if all registry files are present.
+    """
+    return all(container.exists(f"{CONNECTOR_REGISTRY_MIRROR_DIR}/{path}") for path in CONNECTOR_REGISTRY_FILES)
+
+
+def count_connectors(files):
+    """Count the connector definitions in the downloaded registry.
+
+    Args:
+        files: the files returned by fetch_registry.
+
+    Returns:
+        The number of source and destination definitions.
+    """
+    registry = json.loads(files[CONNECTOR_REGISTRY_FILES[0]])
+    return len(registry.get("sources", [])) + len(registry.get("destinations", []))
@@ -17,6 +17,7 @@ from serialized_data_interface import (
 from charm_helpers import construct_svc_endpoint
 from connections import ObjectStorageConnection
 from log import log_event_handler
+from snapshot import relation_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -56,6 +57,7 @@ class MinioRelation(framework.Object):
         """
         self.charm.reconcile()
 
+    @relation_snapshot
     def get_data(self) -> ObjectStorageConnection | None:
         """Return live object-storage data from the relation, or None.
 
@@ -122,12 +124,12 @@ class MinioRelation(framework.Object):
         Raises:
             ErrorWithStatus: if an anticipated error occurs.
         """
-        if not ((obj_storage := interfaces["object-storage"]) and obj_storage.get_data()):
+        if not ((obj_storage := interfaces["object-storage"]) and (data := obj_storage.get_data())):
             raise ErrorWithStatus("Waiting for object-storage relation data", WaitingStatus)
 
         try:
-            logger.info(f"obj_storage get_data: {obj_storage.get_data()}")
-            obj_storage = list(obj_storage.get_data().values())[0]
+            logger.info(f"obj_storage get_data: {data}")
+            obj_storage = list(data.values())[0]
         except Exception as e:
             raise ErrorWithStatus(
                 f"Unexpected error unpacking object storage data - data format not "
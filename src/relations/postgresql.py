@@ -11,25 +11,33 @@ from ops import framework
 from connections import DatabaseConnection
 from literals import DB_NAME
 from log import log_event_handler
+from snapshot import relation_snapshot
 
 logger = logging.getLogger(__name__)
 
 
 class PostgresqlRelation(framework.Object):
-    """Client for airbyte:postgresql relations."""
+    """Client for airbyte:postgresql relations.
 
-    def __init__(self, charm):
+    Also serves the pgbouncer relation, which speaks the same interface.
+    """
+
+    def __init__(self, charm, requirer, relation_name="db"):
         """Construct.
 
         Args:
             charm: The charm to attach the hooks to.
+            requirer: The DatabaseRequires instance handling the relation.
+            relation_name: Name of the postgresql_client relation.
         """
-        super().__init__(charm, "db")
+        super().__init__(charm, relation_name)
         self.charm = charm
+        self.requirer = requirer
+        self.relation_name = relation_name
 
-        charm.framework.observe(charm.db.on.database_created, self._on_database_changed)
-        charm.framework.observe(charm.db.on.endpoints_changed, self._on_database_changed)
-        charm.framework.observe(charm.on.db_relation_broken, self._on_database_relation_broken)
+        charm.framework.observe(requirer.on.database_created, self._on_database_changed)
+        charm.framework.observe(requirer.on.endpoints_changed, self._on_database_changed)
+        charm.framework.observe(charm.on[relation_name].relation_broken, self._on_database_relation_broken)
 
     @log_event_handler(logger)
     def _on_database_changed(self, event: DatabaseEvent) -> None:
@@ -49,25 +57,40 @@ class PostgresqlRelation(framework.Object):
         """
         self.charm.reconcile()
 
+    @relation_snapshot
     def get_data(self) -> DatabaseConnection | None:
         """Return the live database connection details, or None.
 
         Returns:
-            A DatabaseConnection derived from the db relation, or None if the
+            A DatabaseConnection derived from the relation, or None if the
             relation is absent or not yet ready.
         """
-        relation = self.model.get_relation("db")
+        relation = self.model.get_relation(self.relation_name)
         if relation is None:
             return None
-        data = self.charm.db.fetch_relation_data().get(relation.id, {})
+        data = self.requirer.fetch_relation_data().get(relation.id, {})
         endpoints = data.get("endpoints")
         if not endpoints:
             return None
-        host, port = endpoints.split(",", 1)[0].split(":")
+        endpoints = _split_endpoints(endpoints)
+        host, port = endpoints[0].split(":")
         return DatabaseConnection(
             dbname=DB_NAME,
             host=host,
             port=port,
             user=data.get("username"),
             password=data.get("password"),
+            endpoints=endpoints,
         )
+
+
+def _split_endpoints(endpoints):
+    """Split a comma-separated endpoints string from the relation.
+
+    Args:
+        endpoints: the "host:port,host:port" string, or None.
+
+    Returns:
+        A tuple of "host:port" endpoints.
+    """
+    return tuple(endpoint.strip() for endpoint in (endpoints or "").split(",") if endpoint.strip())
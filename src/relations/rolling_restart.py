@@ -0,0 +1,119 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Define the rolling restart lock held over the airbyte-peer relation."""
+
+import json
+import logging
+
+from ops import framework
+
+from literals import RESTART_LOCK_KEY, RESTART_REQUESTED_KEY
+from log import log_event_handler
+
+logger = logging.getLogger(__name__)
+
+
+class RollingRestart(framework.Object):
+    """Lock letting a limited number of units restart their services at a time.
+
+    Units waiting to restart flag a request in their peer unit data; the leader
+    grants the lock to at most `rolling-restart-max-units` of them by listing
+    them in the peer application data. A unit keeps the lock until it has no
+    restart left to apply and its services are healthy again, then withdraws
+    its request.
+    """
+
+    def __init__(self, charm):
+        """Construct.
+
+        Args:
+            charm: The charm to attach the hooks to.
+        """
+        super().__init__(charm, "rolling-restart")
+        self.charm = charm
+        charm.framework.observe(charm.on.airbyte_peer_relation_departed, self._on_peer_relation_departed)
+
+    @log_event_handler(logger)
+    def _on_peer_relation_departed(self, event):
+        """Handle a unit leaving, possibly while holding the lock.
+
+        Args:
+            event: The event triggered when a peer unit departed.
+        """
+        self.charm.reconcile()
+
+    @property
+    def _relation(self):
+        """The peer relation, or None before it is created.
+
+        Returns:
+            The airbyte-peer relation.
+        """
+        return self.model.get_relation("airbyte-peer")
+
+    @property
+    def _max_units(self):
+        """The number of units allowed to restart at a time; 0 disables the lock.
+
+        Returns:
+            The `rolling-restart-max-units` config value.
+        """
+        return self.charm.config["rolling-restart-max-units"]
+
+    def acquire(self):
+        """Request the lock for this unit and report whether it holds it.
+
+        Returns:
+            True if this unit may restart its services now.
+        """
+        if not self._max_units or not self._relation:
+            return True
+        self._relation.data[self.model.unit][RESTART_REQUESTED_KEY] = "true"
+        self.grant()
+        return self.model.unit.name in self._holders()
+
+    def is_requested(self):
+        """Check whether this unit has requested the lock and not released it yet.
+
+        Returns:
+            True if this unit's request is outstanding.
+        """
+        return bool(self._relation and RESTART_REQUESTED_KEY in self._relation.data[self.model.unit])
+
+    def release(self):
+        """Withdraw this unit's request once it holds the lock, letting the leader pass it on.
+
+        A unit still waiting for the lock keeps its request: its restart has not
+        been applied yet.
+        """
+        if self.is_requested() and self.model.unit.name in self._holders():
+            del self._relation.data[self.model.unit][RESTART_REQUESTED_KEY]
+            logger.info("Released the rolling restart lock")
+            # Other units only see the release through the leader's grant.
+            self.grant()
+
+    def grant(self):
+        """Pass the lock on to the units waiting for it, on the leader only."""
+        if not self.model.unit.is_leader() or not self._max_units or not self._relation:
+            return
+
+        units = [self.model.unit, *self._relation.units]
+        requesting = sorted(
+            (unit.name for unit in units if RESTART_REQUESTED_KEY in self._relation.data[unit]),
+            key=lambda name: int(name.rpartition("/")[2]),
+        )
+        holders = [name for name in self._holders() if name in requesting]
+        for name in requesting:
+            if name not in holders and len(holders) < self._max_units:
+                logger.info("Granting the rolling restart lock to %s", name)
+                holders.append(name)
+        self._relation.data[self.model.app][RESTART_LOCK_KEY] = json.dumps(holders)
+
+    def _holders(self):
+        """Return the units holding the lock.
+
+        Returns:
+            A list of unit names.
+        """
+        return json.loads(self._relation.data[self.model.app].get(RESTART_LOCK_KEY, "[]"))
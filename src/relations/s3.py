@@ -3,9 +3,9 @@
 
 """S3 relation implementation."""
 
+import functools
 import logging
 
-import botocore
 from charms.data_platform_libs.v0.s3 import (
     CredentialsChangedEvent,
     CredentialsGoneEvent,
@@ -14,6 +14,7 @@ from ops import framework
 
 from connections import S3Connection
 from log import log_event_handler
+from snapshot import relation_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +51,7 @@ class S3Integrator(framework.Object):
         """
         self.charm.reconcile()
 
+    @relation_snapshot
     def get_data(self) -> S3Connection | None:
         """Return live S3 data from the relation, or None.
 
@@ -125,16 +127,27 @@ def _construct_endpoint(s3_parameters):
     # Use the provided endpoint if a region is not needed.
     endpoint = s3_parameters["endpoint"]
 
-    # Load endpoints data.
-    loader = botocore.loaders.create_loader()
-    data = loader.load_data("endpoints")
-
     # Construct the endpoint using the region.
-    resolver = botocore.regions.EndpointResolver(data)
-    endpoint_data = resolver.construct_endpoint("s3", s3_parameters["region"])
+    endpoint_data = _get_endpoint_resolver().construct_endpoint("s3", s3_parameters["region"])
 
     # Use the built endpoint if it is an AWS endpoint.
     if endpoint_data and endpoint.endswith(endpoint_data["dnsSuffix"]):
         endpoint = f'{endpoint.split("://")[0]}://{endpoint_data["hostname"]}'
 
     return endpoint
+
+
+@functools.cache
+def _get_endpoint_resolver():
+    """Load botocore's endpoints data, once per dispatch.
+
+    Returns:
+        A botocore EndpointResolver.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    import botocore.loaders
+
+    # pylint: disable-next=import-outside-toplevel
+    import botocore.regions
+
+    return botocore.regions.EndpointResolver(botocore.loaders.create_loader().load_data("endpoints"))
@@ -0,0 +1,35 @@
+# Copyright 2024 Canonical Ltd.
+# See LICENSE file for licensing details.
+
+"""Define relation snapshot helpers."""
+
+import functools
+
+
+def relation_snapshot(method):
+    """Memoize a relation's parsed data for the rest of the dispatch.
+
+    Remote relation data cannot change while a hook runs, and the charm object
+    lives for a single dispatch, so the relation databag is read, parsed and
+    validated once however many code paths ask for it.
+
+    Args:
+        method: argument-less method reading the relation data.
+
+    Returns:
+        Decorated method.
+    """
+    attribute = f"_snapshot_{method.__name__}"
+
+    @functools.wraps(method)
+    def decorated(self):
+        """Snapshot decorator method.
+
+        Returns:
+            The value returned by the first call of the method.
+        """
+        if attribute not in self.__dict__:
+            self.__dict__[attribute] = method(self)
+        return self.__dict__[attribute]
+
+    return decorated
@@ -11,7 +11,17 @@ import re
 from enum import Enum
 
 from charms.data_platform_libs.v0.data_models import BaseConfigModel
-from pydantic import field_validator
+from pydantic import ValidationInfo, field_validator, model_validator
+
+from literals import (
+    CONTAINER_HEALTH_CHECK_MAP,
+    DATABASE_POOL_CONTAINERS,
+    DATABASE_POOL_SETTINGS,
+    METRICS_BINDERS,
+    METRICS_EXPORT_SETTINGS,
+    TELEMETRY_CONTAINERS,
+    WORKER_TASK_QUEUES,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +70,9 @@ class CharmConfig(BaseConfigModel):
     """Manager for the structured configuration."""
 
     log_level: LogLevelType
+    log_level_overrides: str | None = None
+    log_logger_levels: str | None = None
+    log_rate_limits: str | None = None
     temporal_host: str
     webapp_url: str | None = None
     secret_persistence: SecretPersistenceType | None = None
@@ -91,7 +104,25 @@ class CharmConfig(BaseConfigModel):
     max_check_workers: int | None = None
     max_sync_workers: int | None = None
     max_discover_workers: int | None = None
+    worker_task_queues: str
+    worker_task_queue_overrides: str | None = None
+    temporal_worker_port_start: int
+    temporal_worker_port_count: int
+    staged_startup: bool
+    startup_concurrency: int
+    rolling_restart_max_units: int
+    drain_timeout: int
+    readiness_gated_service: bool
+    database_pool_max_size: int
+    database_pool_min_idle: int
+    database_pool_connection_timeout_ms: int
+    database_pool_overrides: str | None = None
+    database_max_connections: int
+    database_pooler_endpoint: str | None = None
+    database_pooler_services: str | None = None
     temporal_history_retention_in_days: int | None = None
+    job_history_retention_days: int
+    job_history_purge_batch_size: int
     job_kube_tolerations: str | None = None
     job_kube_node_selectors: str | None = None
     job_kube_annotations: str | None = None
@@ -102,6 +133,8 @@ class CharmConfig(BaseConfigModel):
     job_kube_busybox_image: str | None = None
     job_kube_curl_image: str | None = None
     job_kube_namespace: str | None = None
+    image_prepull_enabled: bool
+    image_prepull_images: str | None = None
     spec_job_kube_node_selectors: str | None = None
     check_job_kube_node_selectors: str | None = None
     discover_job_kube_node_selectors: str | None = None
@@ -111,12 +144,25 @@ class CharmConfig(BaseConfigModel):
     storage_type: StorageType
     storage_bucket_logs: str
     logs_ttl: int
+    job_logs_compressed: bool
+    job_logs_local_max_size_mb: int
+    job_logs_upload_max_lines: int
+    job_logs_drop_debug: bool
     storage_bucket_state: str
     storage_bucket_activity_payload: str
     storage_bucket_workload_output: str
     pod_running_ttl_minutes: int
     pod_successful_ttl_minutes: int
     pod_unsuccessful_ttl_minutes: int
+    connector_registry_mirror: bool
+    connector_registry_source_url: str
+    metrics_export_step_seconds: int
+    metrics_export_batch_size: int
+    metrics_export_overrides: str | None = None
+    metrics_disabled_binders: str | None = None
+    tracing_enabled: bool
+    tracing_sample_ratio: float
+    tracing_disabled_instrumentations: str | None = None
 
     @field_validator("*", mode="before")
     @classmethod
@@ -133,7 +179,18 @@ class CharmConfig(BaseConfigModel):
             return None
         return value
 
-    @field_validator("pod_running_ttl_minutes", "pod_successful_ttl_minutes", "pod_unsuccessful_ttl_minutes")
+    @field_validator(
+        "pod_running_ttl_minutes",
+        "pod_successful_ttl_minutes",
+        "pod_unsuccessful_ttl_minutes",
+        "job_history_purge_batch_size",
+        "metrics_export_step_seconds",
+        "metrics_export_batch_size",
+        "job_logs_local_max_size_mb",
+        "job_logs_upload_max_lines",
+        "temporal_worker_port_start",
+        "temporal_worker_port_count",
+    )
     @classmethod
     def greater_than_zero(cls, value: str) -> int | None:
         """Check validity of `*-ttl-minutes` fields.
@@ -152,7 +209,116 @@ class CharmConfig(BaseConfigModel):
             return int_value
         raise ValueError("Value out of range.")
 
-    @field_validator("logs_ttl")
+    @field_validator("database_pool_max_size", "database_pool_connection_timeout_ms")
+    @classmethod
+    def database_pool_greater_than_zero(cls, value: str) -> int | None:
+        """Check validity of the `database-pool-*` size and timeout fields.
+
+        Args:
+            value: database pool setting value
+
+        Returns:
+            int_value: integer for the database pool setting
+
+        Raises:
+            ValueError: in the case when the value is out of range
+        """
+        int_value = int(value)
+        if int_value > 0:
+            return int_value
+        raise ValueError("Value out of range.")
+
+    @field_validator("database_pool_min_idle", "database_max_connections")
+    @classmethod
+    def database_zero_or_greater(cls, value: str) -> int | None:
+        """Check validity of `database-pool-min-idle` and `database-max-connections` fields.
+
+        Args:
+            value: database setting value
+
+        Returns:
+            int_value: integer for the database setting
+
+        Raises:
+            ValueError: in the case when the value is out of range
+        """
+        int_value = int(value)
+        if int_value >= 0:
+            return int_value
+        raise ValueError("Value out of range.")
+
+    @field_validator("database_pool_overrides")
+    @classmethod
+    def database_pool_overrides_validator(cls, value: str) -> str | None:
+        """Check validity of `database-pool-overrides` field.
+
+        Args:
+            value: database-pool-overrides value
+
+        Returns:
+            value: database-pool-overrides value
+
+        Raises:
+            ValueError: in the case when an override is malformed or out of range
+        """
+        for item in value.split(","):
+            if not item.strip():
+                continue
+            key, _, setting_value = item.partition("=")
+            container_name, _, setting = key.strip().rpartition(".")
+            if container_name not in DATABASE_POOL_CONTAINERS or setting not in DATABASE_POOL_SETTINGS:
+                raise ValueError(f"Invalid database pool override {item.strip()!r}.")
+            try:
+                int_value = int(setting_value)
+            except ValueError:
+                raise ValueError(f"Invalid database pool override {item.strip()!r}.") from None
+            # Same bounds as the global database-pool-* options.
+            if int_value < 0 or (int_value == 0 and setting != "min-idle"):
+                raise ValueError("Value out of range.")
+        return value
+
+    @field_validator("database_pooler_endpoint")
+    @classmethod
+    def database_pooler_endpoint_validator(cls, value: str) -> str | None:
+        """Check validity of `database-pooler-endpoint` field.
+
+        Args:
+            value: database-pooler-endpoint value
+
+        Returns:
+            value: database-pooler-endpoint value
+
+        Raises:
+            ValueError: in the case when the value is not a host:port pair
+        """
+        host, _, port = value.rpartition(":")
+        if host and int(port) > 0:
+            return value
+        raise ValueError("Invalid database pooler endpoint.")
+
+    @field_validator("database_pooler_services")
+    @classmethod
+    def database_pooler_services_validator(cls, value: str) -> str | None:
+        """Check validity of `database-pooler-services` field.
+
+        Args:
+            value: database-pooler-services value
+
+        Returns:
+            value: database-pooler-services value
+
+        Raises:
+            ValueError: in the case when a service cannot use the pooler
+        """
+        for container_name in value.split(","):
+            container_name = container_name.strip()
+            if container_name not in DATABASE_POOL_CONTAINERS or container_name == "airbyte-bootloader":
+                raise ValueError(f"Service {container_name!r} cannot connect through the pooler.")
+        return value
+
+    @field_validator(
+        "logs_ttl", "job_history_retention_days", "startup_concurrency", "rolling_restart_max_units", "drain_timeout"
+    )
     @classmethod
     def zero_or_greater(cls, value: str) -> int | None:
         """Check validity of `logs-ttl` fields.
@@ -219,3 +385,152 @@ class CharmConfig(BaseConfigModel):
         if int_value > 0:
             return value
         raise ValueError("Invalid CPU request/limit value.")
+
+    @field_validator("log_level_overrides", "log_logger_levels", "log_rate_limits")
+    @classmethod
+    def log_settings_validator(cls, value: str, info: ValidationInfo) -> str | None:
+        """Check validity of the `log-level-overrides`, `log-logger-levels` and `log-rate-limits` fields.
+
+        Args:
+            value: comma-separated name=value pairs
+            info: the validated field
+
+        Returns:
+            value: comma-separated name=value pairs
+
+        Raises:
+            ValueError: in the case when a pair is malformed
+        """
+        logger_pattern = re.compile(r"^[A-Za-z_$][\w$]*(\.[A-Za-z_$][\w$]*)*$")
+        for item in value.split(","):
+            name, _, setting = (part.strip() for part in item.partition("="))
+            if info.field_name == "log_level_overrides":
+                valid_name = name in CONTAINER_HEALTH_CHECK_MAP
+            else:
+                valid_name = bool(logger_pattern.match(name))
+            if info.field_name == "log_rate_limits":
+                valid_setting = setting.isdigit() and int(setting) > 0
+            else:
+                valid_setting = setting in LogLevelType.__members__
+            if not valid_name or not valid_setting:
+                raise ValueError(f"Invalid log setting {item.strip()!r}.")
+        return value
+
+    @field_validator("worker_task_queues")
+    @classmethod
+    def worker_task_queues_validator(cls, value: str) -> str | None:
+        """Check validity of `worker-task-queues` field.
+
+        Args:
+            value: worker-task-queues value
+
+        Returns:
+            value: worker-task-queues value
+
+        Raises:
+            ValueError: in the case when a task queue is unknown
+        """
+        for task_queue in value.split(","):
+            if task_queue.strip() not in WORKER_TASK_QUEUES:
+                raise ValueError(f"Unknown task queue {task_queue.strip()!r}.")
+        return value
+
+    @field_validator("worker_task_queue_overrides")
+    @classmethod
+    def worker_task_queue_overrides_validator(cls, value: str) -> str | None:
+        """Check validity of `worker-task-queue-overrides` field.
+
+        Args:
+            value: worker-task-queue-overrides value
+
+        Returns:
+            value: worker-task-queue-overrides value
+
+        Raises:
+            ValueError: in the case when an override is malformed
+        """
+        for item in value.split(","):
+            unit, _, task_queues = item.strip().partition("=")
+            if not unit.isdigit() or any(task_queue not in WORKER_TASK_QUEUES for task_queue in task_queues.split("+")):
+                raise ValueError(f"Invalid task queue override {item.strip()!r}.")
+        return value
+
+    @model_validator(mode="after")
+    def worker_task_queues_coverage_validator(self) -> "CharmConfig":
+        """Check that `worker-task-queues` and its overrides poll every task queue.
+
+        Returns:
+            self: the validated config
+
+        Raises:
+            ValueError: in the case when a task queue is polled by no unit
+        """
+        task_queues = {task_queue.strip() for task_queue in self.worker_task_queues.split(",")}
+        for item in (self.worker_task_queue_overrides or "").split(","):
+            task_queues.update(item.strip().partition("=")[2].split("+"))
+        unpolled = [task_queue for task_queue in WORKER_TASK_QUEUES if task_queue not in task_queues]
+        if unpolled:
+            raise ValueError(f"Task queues {', '.join(unpolled)} are not polled by any unit.")
+        return self
+
+    @field_validator("metrics_export_overrides")
+    @classmethod
+    def metrics_export_overrides_validator(cls, value: str) -> str | None:
+        """Check validity of `metrics-export-overrides` field.
+
+        Args:
+            value: metrics-export-overrides value
+
+        Returns:
+            value: metrics-export-overrides value
+
+        Raises:
+            ValueError: in the case when an override is malformed
+        """
+        for item in value.split(","):
+            key, _, setting_value = item.partition("=")
+            container_name, _, setting = key.strip().rpartition(".")
+            if container_name not in TELEMETRY_CONTAINERS or setting not in METRICS_EXPORT_SETTINGS:
+                raise ValueError(f"Invalid metrics export override {item.strip()!r}.")
+            if int(setting_value) <= 0:
+                raise ValueError(f"Invalid metrics export override {item.strip()!r}.")
+        return value
+
+    @field_validator("metrics_disabled_binders")
+    @classmethod
+    def metrics_disabled_binders_validator(cls, value: str) -> str | None:
+        """Check validity of `metrics-disabled-binders` field.
+
+        Args:
+            value: metrics-disabled-binders value
+
+        Returns:
+            value: metrics-disabled-binders value
+
+        Raises:
+            ValueError: in the case when an entry is unknown
+        """
+        for item in value.split(","):
+            container_name, _, binder = item.strip().rpartition(".")
+            if (container_name and container_name not in TELEMETRY_CONTAINERS) or binder not in METRICS_BINDERS:
+                raise ValueError(f"Invalid meter binder {item.strip()!r}.")
+        return value
+
+    @field_validator("tracing_sample_ratio")
+    @classmethod
+    def sample_ratio_validator(cls, value: str) -> float | None:
+        """Check validity of `tracing-sample-ratio` field.
+
+        Args:
+            value: tracing-sample-ratio value
+
+        Returns:
+            float_value: float for tracing-sample-ratio configuration
+
+        Raises:
+            ValueError: in the case when the value is out of range
+        """
+        float_value = float(value)
+        if 0 <= float_value <= 1:
+            return float_value
+        raise ValueError("Value out of range.")
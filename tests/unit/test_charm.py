@@ -12,16 +12,40 @@ import base64
 import dataclasses
 import json
 import logging
+import lzma
+import os
+import pathlib
+import subprocess  # nosec
+import sys
+import time
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
+from charms.data_platform_libs.v0.database_requires import DatabaseRequires
+from charms.grafana_k8s.v0.grafana_dashboard import LZMABase64
 from kubernetes.client.exceptions import ApiException
 from ops import testing
 from ops.model import ActiveStatus, BlockedStatus, MaintenanceStatus, WaitingStatus
-from ops.pebble import CheckLevel, CheckStartup, CheckStatus, Layer
+from ops.pebble import (
+    CheckLevel,
+    CheckStartup,
+    CheckStatus,
+    Layer,
+    PathError,
+    ServiceStatus,
+)
+from ops.pebble import TimeoutError as PebbleTimeoutError
 
 from charm import AirbyteK8SOperatorCharm
-from src.literals import BASE_ENV, CONTAINER_HEALTH_CHECK_MAP, INTERNAL_API_PORT
+from job_history import purge_job_history
+from src.literals import (
+    AIRBYTE_VERSION,
+    BASE_ENV,
+    CONTAINER_HEALTH_CHECK_MAP,
+    DATABASE_POOL_CONTAINERS,
+    INTERNAL_API_PORT,
+    JOB_HISTORY_PURGE_MAX_BATCHES,
+)
 from src.structured_config import StorageType
 
 logging.basicConfig(level=logging.DEBUG)
@@ -31,6 +55,10 @@ mock_incomplete_pebble_plan = {"services": {"airbyte": {"override": "replace"}}}
 MODEL_NAME = "airbyte-model"
 APP_NAME = "airbyte-k8s"
 
+# The db relation advertises two endpoints, so services get a multi-host URL
+# that fails over to whichever one is the primary.
+PRIMARY_DATABASE_URL = "jdbc:postgresql://myhost:5432,anotherhost:2345/airbyte-k8s_db?targetServerType=primary"
+
 # The charm derives db/minio/s3 state live from their relations on each
 # reconcile (no persisted state), so a "ready" charm is reproduced by providing
 # those relations with data rather than by pre-populating a peer databag.
@@ -47,6 +75,18 @@ MINIO_RAW = {
 }
 
 
+REGISTRY_FILES = {
+    "registries/v0/oss_registry.json": json.dumps(
+        {"sources": [{"name": "Postgres"}, {"name": "MySQL"}], "destinations": [{"name": "S3"}]}
+    ).encode(),
+    "resources/connector_stubs/v0/connector_stubs.json": b"[]",
+}
+
+
+# Modules slow to import which hooks must only load when they use them.
+LAZY_MODULES = ["boto3", "botocore", "kubernetes"]
+
+
 class TestCharm(TestCase):
     """Unit tests.
 
@@ -64,6 +104,11 @@ class TestCharm(TestCase):
         self.mock_k8s_api = patcher2.start()
         self.addCleanup(patcher1.stop)
         self.addCleanup(patcher2.stop)
+        patcher3 = patch("kubernetes.client.AppsV1Api")
+        self.mock_k8s_apps_api = patcher3.start()
+        self.addCleanup(patcher3.stop)
+        self.mock_apps_v1_instance = MagicMock()
+        self.mock_k8s_apps_api.return_value = self.mock_apps_v1_instance
         self.mock_core_v1_instance = MagicMock()
         self.mock_k8s_api.return_value = self.mock_core_v1_instance
 
@@ -96,6 +141,11 @@ class TestCharm(TestCase):
             stub.start()
             self.addCleanup(stub.stop)
 
+        # The charm pushes its own metrics to the collector at the end of each dispatch.
+        patcher4 = patch("charm_metrics.urlopen")
+        self.mock_urlopen = patcher4.start()
+        self.addCleanup(patcher4.stop)
+
         self.ctx = testing.Context(AirbyteK8SOperatorCharm)
 
     def test_initial_plan(self):
@@ -169,6 +219,268 @@ class TestCharm(TestCase):
         out = self.ctx.run(self.ctx.on.update_status(), mid)
         self.assertEqual(out.unit_status, MaintenanceStatus("Status check: 'airbyte-workload-api-server' DOWN"))
 
+    def test_pebble_check_failed(self):
+        """A failing health check is reflected in the status without waiting for update-status."""
+        state = make_state(db=True, minio=True)
+        mid = self.ctx.run(self.ctx.on.pebble_ready(get_container(state, "airbyte-server")), state)
+
+        mid = with_checks(mid, CheckStatus.UP)
+        mid = replace_container(mid, "airbyte-workers", check_infos=frozenset({_up_check(CheckStatus.DOWN)}))
+        container = get_container(mid, "airbyte-workers")
+        out = self.ctx.run(self.ctx.on.pebble_check_failed(container, _up_check(CheckStatus.DOWN)), mid)
+
+        self.assertEqual(out.unit_status, MaintenanceStatus("Status check: 'airbyte-workers' DOWN"))
+
+    def test_pebble_check_recovered(self):
+        """Recovered health checks turn the unit active and tell the UI the server is ready."""
+        state = make_state(db=True, minio=True)
+        mid = self.ctx.run(self.ctx.on.pebble_ready(get_container(state, "airbyte-server")), state)
+
+        ui_relation = testing.Relation("airbyte-server")
+        mid = add_relations(with_checks(mid, CheckStatus.UP), ui_relation)
+        container = get_container(mid, "airbyte-workers")
+        out = self.ctx.run(self.ctx.on.pebble_check_recovered(container, _up_check(CheckStatus.UP)), mid)
+
+        self.assertEqual(out.unit_status, ActiveStatus())
+        self.assertEqual(out.get_relation(ui_relation.id).local_app_data["server_status"], "ready")
+
+    def test_staged_startup(self):
+        """Each startup stage is configured once the previous one is healthy."""
+        state = make_state(db=True, minio=True, config={"staged-startup": True})
+        mid = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        planned = {c.name for c in mid.containers if c.name in c.plan.services}
+        self.assertEqual(planned, {"airbyte-bootloader", "airbyte-server", "airbyte-workload-api-server"})
+
+        # The server has not passed its health check yet: the next stage waits.
+        for container_name in ("airbyte-server", "airbyte-workload-api-server"):
+            mid = replace_container(mid, container_name, check_infos=frozenset({_up_check(CheckStatus.UP, 0)}))
+        mid = self.ctx.run(self.ctx.on.config_changed(), mid)
+        self.assertNotIn("airbyte-workers", get_container(mid, "airbyte-workers").plan.services)
+
+        for container_name in ("airbyte-server", "airbyte-workload-api-server"):
+            mid = replace_container(mid, container_name, check_infos=frozenset({_up_check(CheckStatus.UP, 1)}))
+        container = get_container(mid, "airbyte-server")
+        out = self.ctx.run(self.ctx.on.pebble_check_recovered(container, _up_check(CheckStatus.UP, 1)), mid)
+
+        planned = {c.name for c in out.containers if c.name in c.plan.services}
+        self.assertEqual(
+            planned,
+            {
+                "airbyte-bootloader",
+                "airbyte-server",
+                "airbyte-workload-api-server",
+                "airbyte-workload-launcher",
+                "airbyte-workers",
+            },
+        )
+
+    def test_startup_concurrency(self):
+        """No more services than startup-concurrency start at the same time."""
+        state = make_state(db=True, minio=True, config={"startup-concurrency": 1})
+        out = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        planned = {c.name for c in out.containers if c.name in c.plan.services}
+        self.assertEqual(planned, {"airbyte-bootloader", "airbyte-server"})
+
+    def test_staged_restart(self):
+        """Config changes restart healthy services by stage, startup-concurrency at a time."""
+        mid = self.ctx.run(self.ctx.on.config_changed(), make_state(db=True, minio=True))
+
+        config = {**mid.config, "staged-startup": True, "startup-concurrency": 2, "log-level": "DEBUG"}
+        out = self.ctx.run(
+            self.ctx.on.config_changed(), dataclasses.replace(with_checks(mid, CheckStatus.UP), config=config)
+        )
+
+        restarted = {
+            c.name
+            for c in out.containers
+            if c.name != "airbyte-bootloader" and c.plan.services[c.name].environment["LOG_LEVEL"] == "DEBUG"
+        }
+        self.assertEqual(restarted, {"airbyte-server", "airbyte-workload-api-server"})
+
+    def test_rolling_restart(self):
+        """The leader grants itself the restart lock, released once its services are healthy."""
+        state = make_state(db=True, minio=True)
+        mid = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        mid = dataclasses.replace(mid, config={**mid.config, "log-level": "DEBUG"})
+        mid = self.ctx.run(self.ctx.on.config_changed(), mid)
+
+        env = get_container(mid, "airbyte-server").plan.services["airbyte-server"].environment
+        self.assertEqual(env["LOG_LEVEL"], "DEBUG")
+        peer = mid.get_relations("airbyte-peer")[0]
+        self.assertEqual(json.loads(peer.local_app_data["restart-lock"]), ["airbyte-k8s/0"])
+        self.assertEqual(peer.local_unit_data["restart-requested"], "true")
+
+        mid = self.ctx.run(self.ctx.on.update_status(), with_checks(mid, CheckStatus.UP))
+
+        peer = mid.get_relations("airbyte-peer")[0]
+        self.assertNotIn("restart-requested", peer.local_unit_data)
+        self.assertEqual(json.loads(peer.local_app_data["restart-lock"]), [])
+
+        out = self.ctx.run(self.ctx.on.update_status(), mid)
+        self.assertEqual(out.unit_status, ActiveStatus())
+
+    def test_rolling_restart_kept_until_healthy(self):
+        """The lock is kept while a restarted service has not passed its health check again."""
+        mid = self.ctx.run(self.ctx.on.config_changed(), make_state(db=True, minio=True))
+
+        mid = dataclasses.replace(with_checks(mid, CheckStatus.UP), config={**mid.config, "log-level": "DEBUG"})
+        mid = self.ctx.run(self.ctx.on.config_changed(), mid)
+        mid = replace_container(mid, "airbyte-server", check_infos=frozenset({_up_check(CheckStatus.UP, 0)}))
+        out = self.ctx.run(self.ctx.on.update_status(), mid)
+
+        self.assertEqual(out.get_relations("airbyte-peer")[0].local_unit_data["restart-requested"], "true")
+        self.assertNotEqual(out.unit_status, ActiveStatus())
+
+    def test_rolling_restart_waits_for_lock(self):
+        """A unit keeps its running services until it is granted the restart lock."""
+        state = make_state(db=True, minio=True, leader=False, peer=False)
+        peer = testing.PeerRelation(
+            "airbyte-peer",
+            local_app_data={"restart-lock": json.dumps(["airbyte-k8s/1"]), "migrated-version": AIRBYTE_VERSION},
+            peers_data={1: {"restart-requested": "true"}},
+        )
+        mid = self.ctx.run(self.ctx.on.config_changed(), add_relations(state, peer))
+
+        mid = dataclasses.replace(mid, config={**mid.config, "log-level": "DEBUG"})
+        out = self.ctx.run(self.ctx.on.config_changed(), mid)
+
+        self.assertEqual(out.unit_status, WaitingStatus("waiting for rolling restart lock"))
+        env = get_container(out, "airbyte-server").plan.services["airbyte-server"].environment
+        self.assertEqual(env["LOG_LEVEL"], "INFO")
+        self.assertEqual(out.get_relation(peer.id).local_unit_data["restart-requested"], "true")
+
+        # Its still healthy old services do not make it give up its request.
+        out = self.ctx.run(self.ctx.on.update_status(), with_checks(out, CheckStatus.UP))
+
+        self.assertEqual(out.unit_status, WaitingStatus("waiting for rolling restart lock"))
+        env = get_container(out, "airbyte-server").plan.services["airbyte-server"].environment
+        self.assertEqual(env["LOG_LEVEL"], "INFO")
+        self.assertEqual(out.get_relation(peer.id).local_unit_data["restart-requested"], "true")
+
+    def test_drain_action(self):
+        """The drain action stops the launcher and workers until resumed."""
+        state = make_state(db=True, minio=True)
+        mid = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        mid = self.ctx.run(self.ctx.on.action("drain", params={"resume": False}), mid)
+
+        self.assertEqual(mid.unit_status, MaintenanceStatus("unit drained"))
+        for container_name in ("airbyte-workload-launcher", "airbyte-workers"):
+            statuses = get_container(mid, container_name).service_statuses
+            self.assertEqual(statuses[container_name], ServiceStatus.INACTIVE)
+        self.assertEqual(get_container(mid, "airbyte-server").service_statuses["airbyte-server"], ServiceStatus.ACTIVE)
+
+        mid = self.ctx.run(self.ctx.on.config_changed(), mid)
+        self.assertEqual(mid.unit_status, MaintenanceStatus("unit drained"))
+        statuses = get_container(mid, "airbyte-workers").service_statuses
+        self.assertEqual(statuses["airbyte-workers"], ServiceStatus.INACTIVE)
+
+        out = self.ctx.run(self.ctx.on.action("drain", params={"resume": True}), mid)
+
+        self.assertEqual(out.unit_status, MaintenanceStatus("replanning application"))
+        statuses = get_container(out, "airbyte-workers").service_statuses
+        self.assertEqual(statuses["airbyte-workers"], ServiceStatus.ACTIVE)
+
+    def test_stop_drains(self):
+        """The unit drains launcher and workers when stopped, within the default grace period."""
+        self.mock_core_v1_instance.read_namespaced_pod.return_value.spec.termination_grace_period_seconds = 30
+        state = make_state(db=True, minio=True)
+        mid = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        out = self.ctx.run(self.ctx.on.stop(), mid)
+
+        self.mock_core_v1_instance.read_namespaced_pod.assert_called_once_with("airbyte-k8s-0", MODEL_NAME)
+        for container_name in ("airbyte-workload-launcher", "airbyte-workers"):
+            statuses = get_container(out, container_name).service_statuses
+            self.assertEqual(statuses[container_name], ServiceStatus.INACTIVE)
+
+    def test_stop_drain_bounded_by_grace_period(self):
+        """The drain stops waiting once the pod's termination grace period is spent."""
+        self.mock_core_v1_instance.read_namespaced_pod.return_value.spec.termination_grace_period_seconds = 1
+        mid = self.ctx.run(self.ctx.on.config_changed(), make_state(db=True, minio=True))
+
+        out = self.ctx.run(self.ctx.on.stop(), mid)
+
+        statuses = get_container(out, "airbyte-workers").service_statuses
+        self.assertEqual(statuses["airbyte-workers"], ServiceStatus.ACTIVE)
+
+    def test_stop_drain_error_logged(self):
+        """A failing drain does not fail the stop hook."""
+        self.mock_core_v1_instance.read_namespaced_pod.side_effect = ApiException(status=403)
+        mid = self.ctx.run(self.ctx.on.config_changed(), make_state(db=True, minio=True))
+
+        with patch(
+            "scenario.mocking._MockPebbleClient.stop_services", side_effect=PebbleTimeoutError("timed out")
+        ) as stop_services:
+            self.ctx.run(self.ctx.on.stop(), mid)
+
+        stop_services.assert_called_once()
+
+    def test_readiness_gated_service(self):
+        """Server traffic goes through a Service selecting the units with a ready server."""
+        state = make_state(db=True, minio=True, config={"readiness-gated-service": True})
+        mid = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        manifest = self.mock_core_v1_instance.patch_namespaced_service.call_args.args[2]
+        self.assertEqual(manifest["metadata"]["name"], "airbyte-k8s-server")
+        self.assertEqual(
+            manifest["spec"]["selector"], {"app.kubernetes.io/name": "airbyte-k8s", "airbyte.io/server-ready": "true"}
+        )
+        env = get_container(mid, "airbyte-workers").plan.services["airbyte-workers"].environment
+        self.assertEqual(env["INTERNAL_API_HOST"], "http://airbyte-k8s-server:8001")
+        self.assertEqual(env["WORKLOAD_API_HOST"], "http://airbyte-k8s:8007")
+
+        self.ctx.run(self.ctx.on.update_status(), with_checks(mid, CheckStatus.DOWN))
+        self.mock_core_v1_instance.patch_namespaced_pod.assert_called_with(
+            "airbyte-k8s-0", MODEL_NAME, {"metadata": {"labels": {"airbyte.io/server-ready": "false"}}}
+        )
+
+        self.ctx.run(self.ctx.on.update_status(), with_checks(mid, CheckStatus.UP))
+        self.mock_core_v1_instance.patch_namespaced_pod.assert_called_with(
+            "airbyte-k8s-0", MODEL_NAME, {"metadata": {"labels": {"airbyte.io/server-ready": "true"}}}
+        )
+
+    def test_readiness_gated_service_label_on_restart(self):
+        """A unit is labelled once the Service exists, and unready before its server restarts."""
+        state = make_state(db=True, minio=True, config={"readiness-gated-service": True})
+        mid = self.ctx.run(self.ctx.on.config_changed(), state)
+        mid = with_checks(mid, CheckStatus.UP)
+        self.ctx.run(self.ctx.on.config_changed(), mid)
+        self.mock_core_v1_instance.patch_namespaced_pod.assert_called_with(
+            "airbyte-k8s-0", MODEL_NAME, {"metadata": {"labels": {"airbyte.io/server-ready": "true"}}}
+        )
+
+        mid = dataclasses.replace(mid, config={**mid.config, "log-level": "DEBUG"})
+        out = self.ctx.run(self.ctx.on.config_changed(), mid)
+
+        env = get_container(out, "airbyte-server").plan.services["airbyte-server"].environment
+        self.assertEqual(env["LOG_LEVEL"], "DEBUG")
+        self.mock_core_v1_instance.patch_namespaced_pod.assert_called_with(
+            "airbyte-k8s-0", MODEL_NAME, {"metadata": {"labels": {"airbyte.io/server-ready": "false"}}}
+        )
+
+    def test_readiness_gated_service_disabled(self):
+        """Without readiness-gated-service the leader leaves the Service API alone."""
+        self.ctx.run(self.ctx.on.config_changed(), make_state(db=True, minio=True))
+
+        self.mock_core_v1_instance.delete_namespaced_service.assert_not_called()
+        self.mock_core_v1_instance.patch_namespaced_pod.assert_not_called()
+
+    def test_readiness_gated_service_removed_when_disabled(self):
+        """Turning readiness-gated-service off deletes the server Service once."""
+        state = make_state(db=True, minio=True, config={"readiness-gated-service": True})
+        mid = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        mid = dataclasses.replace(mid, config={**mid.config, "readiness-gated-service": False})
+        out = self.ctx.run(self.ctx.on.config_changed(), mid)
+        self.ctx.run(self.ctx.on.config_changed(), out)
+
+        self.mock_core_v1_instance.delete_namespaced_service.assert_called_once_with("airbyte-k8s-server", MODEL_NAME)
+        self.assertNotIn("server-service", out.get_relations("airbyte-peer")[0].local_app_data)
+
     def test_incomplete_pebble_plan(self):
         """The charm re-applies the pebble plan if incomplete."""
         state = make_state(db=True, minio=True)
@@ -195,6 +507,38 @@ class TestCharm(TestCase):
         plan = out.get_container("airbyte-server").plan.to_dict()
         self.assertIsNotNone(plan)
 
+    def test_relation_data_read_once_per_dispatch(self):
+        """Relation data is read once per dispatch, however many times it is validated."""
+        state = make_state(db=True, minio=True)
+        with (
+            patch("charm.AirbyteK8SOperatorCharm._validate_pebble_plan", return_value=False),
+            patch.object(
+                DatabaseRequires,
+                "fetch_relation_data",
+                autospec=True,
+                side_effect=DatabaseRequires.fetch_relation_data,
+            ) as fetch_relation_data,
+        ):
+            out = self.ctx.run(self.ctx.on.update_status(), state)
+
+        self.assertEqual(out.unit_status, MaintenanceStatus("replanning application"))
+        self.assertEqual(fetch_relation_data.call_count, 1)
+
+    def test_reconcile_coalesced(self):
+        """Reconciles requested during a dispatch run once, at its end."""
+        state = make_state(db=True, minio=True)
+        with patch.object(
+            AirbyteK8SOperatorCharm, "_reconcile", autospec=True, side_effect=AirbyteK8SOperatorCharm._reconcile
+        ) as reconcile:
+            with self.ctx(self.ctx.on.config_changed(), state) as manager:
+                manager.charm.reconcile()
+                manager.charm.reconcile()
+                reconcile.assert_not_called()
+                out = manager.run()
+
+        reconcile.assert_called_once()
+        self.assertEqual(out.unit_status, MaintenanceStatus("replanning application"))
+
     def test_database_relation_changed(self):
         """The db relation event reconciles, deriving the connection live into the plan."""
         db_rel = db_relation()
@@ -326,8 +670,8 @@ class TestCharm(TestCase):
         """Runtime containers wait (unconfigured) until the auth secret exists.
 
         Guards the startup race: a runtime container must not get a plan missing
-        DATAPLANE_CLIENT_ID; it should wait so update-status reconfigures it once
-        the bootloader creates the secret.
+        DATAPLANE_CLIENT_ID; it should wait so the bootloader's completion notice
+        reconfigures it once the bootloader creates the secret.
         """
         self.mock_core_v1_instance.read_namespaced_secret.side_effect = ApiException(status=404)
         state = make_state(db=True, minio=True)
@@ -337,8 +681,594 @@ class TestCharm(TestCase):
         plan = out.get_container("airbyte-server").plan.to_dict()
         self.assertNotIn("airbyte-server", plan.get("services", {}))
 
+    def test_bootloader_completed_notice(self):
+        """The bootloader's completion notice configures the runtime containers right away."""
+        self.mock_core_v1_instance.read_namespaced_secret.side_effect = ApiException(status=404)
+        state = make_state(db=True, minio=True)
+        mid = self.ctx.run(self.ctx.on.pebble_ready(get_container(state, "airbyte-bootloader")), state)
+        self.assertEqual(mid.unit_status, WaitingStatus("waiting for airbyte-auth-secrets"))
+
+        self.mock_core_v1_instance.read_namespaced_secret.side_effect = None
+        notice = testing.Notice("airbyte.io/bootloader-completed")
+        mid = replace_container(mid, "airbyte-bootloader", notices=[notice])
+        out = self.ctx.run(self.ctx.on.pebble_custom_notice(get_container(mid, "airbyte-bootloader"), notice), mid)
+
+        self.assertEqual(out.unit_status, MaintenanceStatus("replanning application"))
+        plan = out.get_container("airbyte-server").plan.to_dict()
+        self.assertIn("DATAPLANE_CLIENT_ID", plan["services"]["airbyte-server"]["environment"])
+
+    def test_bootloader_notice_records_migrated_version(self):
+        """The leader records the migrated version once the bootloader has completed.
+
+        Only the bootloader migrates; the runtime services are held until then,
+        so recording the version does not change their layers.
+        """
+        state = make_state(db=True, minio=True, migrated=False)
+        mid = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        self.assertEqual(mid.unit_status, WaitingStatus("waiting for database migrations"))
+        self.assertEqual(mid.get_container("airbyte-server").plan.to_dict(), {})
+        bootloader_plan = mid.get_container("airbyte-bootloader").plan.to_dict()
+        bootloader_env = bootloader_plan["services"]["airbyte-bootloader"]["environment"]
+        self.assertEqual(bootloader_env["RUN_DATABASE_MIGRATION_ON_STARTUP"], "true")
+
+        notice = testing.Notice("airbyte.io/bootloader-completed")
+        mid = replace_container(mid, "airbyte-bootloader", notices=[notice])
+        out = self.ctx.run(self.ctx.on.pebble_custom_notice(get_container(mid, "airbyte-bootloader"), notice), mid)
+
+        peer = out.get_relations("airbyte-peer")[0]
+        self.assertEqual(peer.local_app_data["migrated-version"], AIRBYTE_VERSION)
+        for container_name in CONTAINER_HEALTH_CHECK_MAP:
+            env = out.get_container(container_name).plan.to_dict()["services"][container_name]["environment"]
+            want = "true" if container_name == "airbyte-bootloader" else "false"
+            self.assertEqual(env["RUN_DATABASE_MIGRATION_ON_STARTUP"], want)
+
+    def test_migrations_pending_on_version_bump(self):
+        """Runtime services wait for the bootloader while the database is on another version."""
+        state = make_state(db=True, minio=True, peer=False)
+        peer = testing.PeerRelation("airbyte-peer", local_app_data={"migrated-version": "1.6.0"})
+        out = self.ctx.run(self.ctx.on.config_changed(), add_relations(state, peer))
+
+        self.assertEqual(out.unit_status, WaitingStatus("waiting for database migrations"))
+        self.assertEqual(out.get_container("airbyte-server").plan.to_dict(), {})
+        self.assertIn("airbyte-bootloader", out.get_container("airbyte-bootloader").plan.services)
+
+    def test_image_prepull_disabled_by_default(self):
+        """Without image-prepull-enabled the leader leaves the DaemonSet API alone."""
+        state = make_state(db=True, minio=True)
+        self.ctx.run(self.ctx.on.config_changed(), state)
+
+        self.mock_apps_v1_instance.delete_namespaced_daemon_set.assert_not_called()
+        self.mock_apps_v1_instance.replace_namespaced_daemon_set.assert_not_called()
 
-def _up_check(status):
+    def test_image_prepull_removed_when_disabled(self):
+        """Turning image-prepull-enabled off deletes the DaemonSet from its job namespace."""
+        config = {"image-prepull-enabled": True, "job-kube-namespace": "jobs"}
+        mid = self.ctx.run(self.ctx.on.config_changed(), make_state(db=True, minio=True, config=config))
+        self.assertEqual(mid.get_relations("airbyte-peer")[0].local_app_data["image-prepull-namespace"], "jobs")
+
+        mid = dataclasses.replace(mid, config={**mid.config, "image-prepull-enabled": False})
+        out = self.ctx.run(self.ctx.on.config_changed(), mid)
+
+        self.mock_apps_v1_instance.delete_namespaced_daemon_set.assert_called_once_with(
+            "airbyte-k8s-image-prepull", "jobs"
+        )
+        self.assertNotIn("image-prepull-namespace", out.get_relations("airbyte-peer")[0].local_app_data)
+
+        self.ctx.run(self.ctx.on.config_changed(), out)
+        self.mock_apps_v1_instance.delete_namespaced_daemon_set.assert_called_once()
+
+    def test_image_prepull_removed_on_remove(self):
+        """The DaemonSet is deleted from the job namespace it was created in on removal.
+
+        That is the recorded namespace, even if the config has changed since or
+        turned pre-pulling off.
+        """
+        config = {"image-prepull-enabled": True, "job-kube-namespace": "jobs"}
+        mid = self.ctx.run(self.ctx.on.config_changed(), make_state(db=True, minio=True, config=config))
+
+        mid = dataclasses.replace(
+            mid, config={**mid.config, "image-prepull-enabled": False, "job-kube-namespace": "other-jobs"}
+        )
+        self.ctx.run(self.ctx.on.remove(), mid)
+
+        name, namespace = self.mock_apps_v1_instance.replace_namespaced_daemon_set.call_args.args[:2]
+        self.assertEqual(namespace, "jobs")
+        self.mock_apps_v1_instance.delete_namespaced_daemon_set.assert_called_once_with(name, "jobs")
+
+    def test_image_prepull_daemonset(self):
+        """The leader applies a pre-pull DaemonSet pinned to the job node selectors."""
+        config = {
+            "image-prepull-enabled": True,
+            "image-prepull-images": "airbyte/source-postgres:3.6.28, airbyte/destination-s3:1.4.0",
+            "job-kube-node-selectors": "pool=jobs,zone=a",
+            "job-kube-busybox-image": "busybox:1.28",
+        }
+        state = make_state(db=True, minio=True, config=config)
+        self.ctx.run(self.ctx.on.config_changed(), state)
+
+        name, namespace, manifest = self.mock_apps_v1_instance.replace_namespaced_daemon_set.call_args.args
+        self.assertEqual((name, namespace), ("airbyte-k8s-image-prepull", MODEL_NAME))
+        pod_spec = manifest["spec"]["template"]["spec"]
+        self.assertEqual(pod_spec["nodeSelector"], {"pool": "jobs", "zone": "a"})
+        tools, *prepull = pod_spec["initContainers"]
+        self.assertEqual(tools["image"], "busybox:1.28")
+        self.assertEqual({container["command"][0] for container in prepull}, {"/prepull/true"})
+        self.assertEqual(
+            [container["image"] for container in prepull],
+            [
+                BASE_ENV["CONTAINER_ORCHESTRATOR_IMAGE"],
+                BASE_ENV["CONNECTOR_SIDECAR_IMAGE"],
+                BASE_ENV["WORKLOAD_INIT_IMAGE"],
+                "busybox:1.28",
+                "airbyte/source-postgres:3.6.28",
+                "airbyte/destination-s3:1.4.0",
+            ],
+        )
+
+    def test_image_prepull_created_when_missing(self):
+        """The pre-pull DaemonSet is created when replacing reports it does not exist."""
+        self.mock_apps_v1_instance.replace_namespaced_daemon_set.side_effect = ApiException(status=404)
+        state = make_state(db=True, minio=True, config={"image-prepull-enabled": True})
+        self.ctx.run(self.ctx.on.config_changed(), state)
+
+        self.mock_apps_v1_instance.create_namespaced_daemon_set.assert_called_once()
+
+    def test_image_prepull_not_managed_by_non_leader(self):
+        """Only the leader manages the pre-pull DaemonSet."""
+        state = make_state(db=True, minio=True, leader=False, config={"image-prepull-enabled": True})
+        self.ctx.run(self.ctx.on.config_changed(), state)
+
+        self.mock_apps_v1_instance.replace_namespaced_daemon_set.assert_not_called()
+
+    def test_database_pool_overrides(self):
+        """Per-service pool overrides reach only the targeted service's datasources."""
+        config = {"database-pool-max-size": 6, "database-pool-overrides": "airbyte-server.max-size=20"}
+        state = make_state(db=True, minio=True, config=config)
+        out = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        server_env = out.get_container("airbyte-server").plan.to_dict()["services"]["airbyte-server"]["environment"]
+        self.assertEqual(server_env["DATASOURCES_CONFIG_MAXIMUM_POOL_SIZE"], 20)
+        self.assertEqual(server_env["DATASOURCES_JOBS_MAXIMUM_POOL_SIZE"], 20)
+        cron_env = out.get_container("airbyte-cron").plan.to_dict()["services"]["airbyte-cron"]["environment"]
+        self.assertEqual(cron_env["DATASOURCES_CONFIG_MAXIMUM_POOL_SIZE"], 6)
+        builder_plan = out.get_container("airbyte-connector-builder-server").plan.to_dict()
+        builder_env = builder_plan["services"]["airbyte-connector-builder-server"]["environment"]
+        self.assertNotIn("DATASOURCES_CONFIG_MAXIMUM_POOL_SIZE", builder_env)
+
+    def test_database_connection_budget_exceeded(self):
+        """The charm blocks when all units' pools could exceed database-max-connections."""
+        state = make_state(db=True, minio=True, config={"database-max-connections": 250})
+        state = dataclasses.replace(state, planned_units=3)
+        out = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        self.assertEqual(
+            out.unit_status,
+            BlockedStatus("database pools need 300 connections, above database-max-connections (250)"),
+        )
+
+    def test_database_connection_budget_within_limit(self):
+        """The charm proceeds when the pools fit within database-max-connections."""
+        state = make_state(db=True, minio=True, config={"database-max-connections": 300})
+        state = dataclasses.replace(state, planned_units=3)
+        out = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        self.assertEqual(out.unit_status, MaintenanceStatus("replanning application"))
+
+    def test_temporal_worker_ports(self):
+        """The Temporal worker port range is rendered from config."""
+        config = {"temporal-worker-port-start": 10000, "temporal-worker-port-count": 25}
+        out = self.ctx.run(self.ctx.on.config_changed(), make_state(db=True, minio=True, config=config))
+
+        env = out.get_container("airbyte-workers").plan.to_dict()["services"]["airbyte-workers"]["environment"]
+        self.assertEqual(env["TEMPORAL_WORKER_PORTS"], ",".join(str(port) for port in range(10000, 10025)))
+
+    def test_temporal_worker_ports_below_concurrency(self):
+        """The charm blocks when the port range cannot serve all concurrent jobs."""
+        config = {"max-sync-workers": 20, "temporal-worker-port-count": 30}
+        out = self.ctx.run(self.ctx.on.config_changed(), make_state(db=True, minio=True, config=config))
+
+        self.assertEqual(
+            out.unit_status,
+            BlockedStatus("temporal-worker-port-count (30) below the 35 concurrent jobs allowed by max-*-workers"),
+        )
+
+    def test_temporal_worker_ports_overlap(self):
+        """The charm blocks when the port range overlaps a service port."""
+        out = self.ctx.run(
+            self.ctx.on.config_changed(),
+            make_state(db=True, minio=True, config={"temporal-worker-port-start": 8990}),
+        )
+
+        self.assertEqual(out.unit_status, BlockedStatus("temporal worker ports 8990-9019 not available"))
+
+    def test_import_time(self):
+        """Importing the charm does not load the S3 and Kubernetes clients."""
+        script = f"import charm, json, sys; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+        start = time.monotonic()
+        result = subprocess.run(  # nosec
+            [sys.executable, "-c", script],
+            capture_output=True,
+            check=True,
+            env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+            text=True,
+        )
+        logging.info("Charm imported in %.3fs", time.monotonic() - start)
+
+        self.assertEqual(json.loads(result.stdout), [])
+
+    def test_kubernetes_client_not_loaded_when_unused(self):
+        """Hooks which do not reach the Kubernetes API do not load its config."""
+        self.ctx.run(self.ctx.on.config_changed(), make_state())
+
+        self.mock_incluster_config.assert_not_called()
+        self.mock_k8s_api.assert_not_called()
+
+    def test_worker_task_queues(self):
+        """Workers poll the task queues of their unit's override, else the configured ones."""
+        config = {
+            "worker-task-queues": "spec,check,discover,sync",
+            "worker-task-queue-overrides": "1=connection-manager+notify",
+        }
+        out = self.ctx.run(self.ctx.on.config_changed(), make_state(db=True, minio=True, config=config))
+
+        env = out.get_container("airbyte-workers").plan.to_dict()["services"]["airbyte-workers"]["environment"]
+        self.assertEqual(env["SHOULD_RUN_SYNC_WORKFLOWS"], "true")
+        self.assertEqual(env["SHOULD_RUN_CONNECTION_MANAGER_WORKFLOWS"], "false")
+        self.assertEqual(env["SHOULD_RUN_NOTIFY_WORKFLOWS"], "false")
+
+        config["worker-task-queue-overrides"] = "0=connection-manager+notify"
+        out = self.ctx.run(self.ctx.on.config_changed(), make_state(db=True, minio=True, config=config))
+
+        env = out.get_container("airbyte-workers").plan.to_dict()["services"]["airbyte-workers"]["environment"]
+        self.assertEqual(env["SHOULD_RUN_SYNC_WORKFLOWS"], "false")
+        self.assertEqual(env["SHOULD_RUN_CONNECTION_MANAGER_WORKFLOWS"], "true")
+        self.assertEqual(env["SHOULD_RUN_NOTIFY_WORKFLOWS"], "true")
+
+    def test_db_pooler_relation(self):
+        """Pooled services connect through the db-pooler relation; the bootloader stays direct.
+
+        Only the bootloader runs migrations, which must not go through the pooler.
+        """
+        pooler = testing.Relation(
+            "db-pooler",
+            remote_app_data={
+                "username": "pooled-user",
+                "password": "pooled-pass",  # nosec
+                "endpoints": "pgbouncer:6432",
+                "database": "airbyte-k8s_db",
+            },
+        )
+        state = add_relations(make_state(db=True, minio=True), pooler)
+        out = self.ctx.run(self.ctx.on.relation_changed(pooler), state)
+
+        env = out.get_container("airbyte-server").plan.to_dict()["services"]["airbyte-server"]["environment"]
+        self.assertEqual(env["DATABASE_URL"], "jdbc:postgresql://pgbouncer:6432/airbyte-k8s_db?prepareThreshold=0")
+        self.assertEqual(env["DATABASE_USER"], "pooled-user")
+        self.assertEqual(env["RUN_DATABASE_MIGRATION_ON_STARTUP"], "false")
+        bootloader_plan = out.get_container("airbyte-bootloader").plan.to_dict()
+        bootloader_env = bootloader_plan["services"]["airbyte-bootloader"]["environment"]
+        self.assertEqual(bootloader_env["DATABASE_URL"], PRIMARY_DATABASE_URL)
+        self.assertEqual(bootloader_env["RUN_DATABASE_MIGRATION_ON_STARTUP"], "true")
+
+    def test_db_pooler_endpoint_config(self):
+        """A configured pooler endpoint reuses the db relation credentials for pooled services."""
+        config = {"database-pooler-endpoint": "pooler.example:6432", "database-pooler-services": "airbyte-cron"}
+        state = make_state(db=True, minio=True, config=config)
+        out = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        cron_env = out.get_container("airbyte-cron").plan.to_dict()["services"]["airbyte-cron"]["environment"]
+        self.assertEqual(
+            cron_env["DATABASE_URL"], "jdbc:postgresql://pooler.example:6432/airbyte-k8s_db?prepareThreshold=0"
+        )
+        self.assertEqual(cron_env["DATABASE_USER"], "jean-luc@db")
+        server_env = out.get_container("airbyte-server").plan.to_dict()["services"]["airbyte-server"]["environment"]
+        self.assertEqual(server_env["DATABASE_URL"], PRIMARY_DATABASE_URL)
+
+    def test_single_database_endpoint(self):
+        """A single primary endpoint yields a plain single-host URL."""
+        db_rel = db_relation()
+        db_rel = dataclasses.replace(db_rel, remote_app_data={**db_rel.remote_app_data, "endpoints": "myhost:5432"})
+        state = add_relations(make_state(minio=True), db_rel)
+        out = self.ctx.run(self.ctx.on.relation_changed(db_rel), state)
+
+        env = out.get_container("airbyte-server").plan.to_dict()["services"]["airbyte-server"]["environment"]
+        self.assertEqual(env["DATABASE_URL"], "jdbc:postgresql://myhost:5432/airbyte-k8s_db")
+        self.assertEqual(
+            env["KEYCLOAK_DATABASE_URL"], "jdbc:postgresql://myhost:5432/airbyte-k8s_db?currentSchema=keycloak"
+        )
+
+    def test_log_level_overrides(self):
+        """A per-service log level overrides the global one for that service only."""
+        state = make_state(db=True, minio=True, config={"log-level-overrides": "airbyte-workload-launcher=DEBUG"})
+        out = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        launcher_plan = out.get_container("airbyte-workload-launcher").plan.to_dict()
+        self.assertEqual(launcher_plan["services"]["airbyte-workload-launcher"]["environment"]["LOG_LEVEL"], "DEBUG")
+        server_env = out.get_container("airbyte-server").plan.to_dict()["services"]["airbyte-server"]["environment"]
+        self.assertEqual(server_env["LOG_LEVEL"], "INFO")
+        self.assertEqual(server_env["LOG4J_CONFIGURATION_FILE"], "log4j2-minio.xml")
+
+    def test_log4j2_overlay(self):
+        """Logger levels and rate limits are pushed as a Log4j2 config merged over the image."""
+        config = {"log-logger-levels": "io.temporal=WARNING", "log-rate-limits": "io.airbyte.commons.temporal=20"}
+        state = make_state(db=True, minio=True, config=config)
+        out = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        server_env = out.get_container("airbyte-server").plan.to_dict()["services"]["airbyte-server"]["environment"]
+        self.assertEqual(server_env["LOG4J_CONFIGURATION_FILE"], "log4j2-minio.xml,/etc/airbyte/log4j2-charm.xml")
+        filesystem = out.get_container("airbyte-server").get_filesystem(self.ctx)
+        overlay = (filesystem / "etc/airbyte/log4j2-charm.xml").read_text()
+        self.assertIn('<Logger name="io.temporal" level="WARN" />', overlay)
+        self.assertIn('<BurstFilter level="WARN" rate="20" maxBurst="200" />', overlay)
+
+    def test_compressed_job_logs(self):
+        """The compressed job logs configuration is pushed and selected before the overlay."""
+        ctx = testing.Context(AirbyteK8SOperatorCharm, charm_root=pathlib.Path(__file__).parents[2])
+        config = {
+            "job-logs-compressed": True,
+            "job-logs-local-max-size-mb": 50,
+            "job-logs-upload-max-lines": 43200,
+            "job-logs-drop-debug": True,
+            "log-logger-levels": "io.temporal=WARNING",
+        }
+        out = ctx.run(ctx.on.config_changed(), make_state(db=True, minio=True, config=config))
+
+        env = out.get_container("airbyte-workers").plan.to_dict()["services"]["airbyte-workers"]["environment"]
+        self.assertEqual(
+            env["LOG4J_CONFIGURATION_FILE"], "/etc/airbyte/log4j2-job-logs.xml,/etc/airbyte/log4j2-charm.xml"
+        )
+        self.assertEqual(env["JOB_LOGS_LOCAL_MAX_SIZE_MB"], 50)
+        self.assertEqual(env["JOB_LOGS_UPLOAD_MAX_LINES"], 43200)
+        self.assertEqual(env["JOB_LOGS_UPLOAD_RATE"], "0.5")
+        self.assertEqual(env["JOB_LOGS_LEVEL"], "INFO")
+        filesystem = out.get_container("airbyte-workers").get_filesystem(ctx)
+        job_logs = (filesystem / "etc/airbyte/log4j2-job-logs.xml").read_text()
+        self.assertIn('filePattern="${ctx:job_log_path}.%i.gz"', job_logs)
+        self.assertIn('maxBurst="${job-log-upload-max-lines}"', job_logs)
+        self.assertNotIn("s3Compression", job_logs)
+
+    @patch("charm.fetch_registry", return_value=REGISTRY_FILES)
+    def test_connector_registry_mirror(self, mock_fetch):
+        """The mirror is populated, served from airbyte-server and used by the services."""
+        state = make_state(db=True, minio=True, config={"connector-registry-mirror": True})
+        out = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        mock_fetch.assert_called_once_with("https://connectors.airbyte.com/files")
+        services = out.get_container("airbyte-server").plan.to_dict()["services"]
+        self.assertIn("http.server 8090", services["connector-registry-mirror"]["command"])
+        env = services["airbyte-server"]["environment"]
+        self.assertEqual(env["CONNECTOR_REGISTRY_BASE_URL"], "http://localhost:8090")
+        self.assertEqual(
+            env["ENTERPRISE_SOURCE_STUBS_URL"],
+            "http://localhost:8090/resources/connector_stubs/v0/connector_stubs.json",
+        )
+        filesystem = out.get_container("airbyte-server").get_filesystem(self.ctx)
+        registry = filesystem / "var/lib/airbyte/connector-registry/registries/v0/oss_registry.json"
+        self.assertEqual(registry.read_bytes(), REGISTRY_FILES["registries/v0/oss_registry.json"])
+        self.assertNotIn("connector-registry-mirror", out.get_container("airbyte-cron").plan.to_dict()["services"])
+
+    @patch("charm.fetch_registry", side_effect=ValueError("unreachable"))
+    def test_connector_registry_mirror_fetch_backoff(self, mock_fetch):
+        """An unreachable source is not retried on every reconcile."""
+        state = make_state(db=True, minio=True, config={"connector-registry-mirror": True})
+        mid = self.ctx.run(self.ctx.on.config_changed(), state)
+        self.ctx.run(self.ctx.on.config_changed(), mid)
+
+        mock_fetch.assert_called_once()
+
+    @patch("charm.push_registry", side_effect=PathError("generic-file-error", "no space left on device"))
+    @patch("charm.fetch_registry", return_value=REGISTRY_FILES)
+    def test_connector_registry_mirror_push_error(self, _, mock_push):
+        """A failed push into the mirror is logged and does not fail the reconcile."""
+        state = make_state(db=True, minio=True, config={"connector-registry-mirror": True})
+        with self.assertLogs("charm", level="WARNING") as logs:
+            out = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        mock_push.assert_called_once()
+        self.assertIn("no space left on device", "".join(logs.output))
+        self.assertIn("connector-registry-mirror", out.get_container("airbyte-server").plan.services)
+
+    @patch("charm.fetch_registry", return_value=REGISTRY_FILES)
+    def test_connector_registry_mirror_disabled(self, _):
+        """Turning the mirror off keeps replan from starting it again."""
+        state = make_state(db=True, minio=True, config={"connector-registry-mirror": True})
+        mid = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        mid = dataclasses.replace(mid, config={**mid.config, "connector-registry-mirror": False})
+        out = self.ctx.run(self.ctx.on.config_changed(), mid)
+
+        container = out.get_container("airbyte-server")
+        self.assertEqual(container.plan.services["connector-registry-mirror"].startup, "disabled")
+        self.assertEqual(container.service_statuses["connector-registry-mirror"], ServiceStatus.INACTIVE)
+
+    @patch("charm.fetch_registry", return_value=REGISTRY_FILES)
+    def test_refresh_connector_registry_action(self, mock_fetch):
+        """The action refreshes the mirror and reports the connectors mirrored."""
+        state = make_state(db=True, minio=True, config={"connector-registry-mirror": True})
+        self.ctx.run(self.ctx.on.action("refresh-connector-registry"), state)
+
+        mock_fetch.assert_called_once()
+        self.assertEqual(self.ctx.action_results, {"connectors": 3})
+
+    def test_refresh_connector_registry_action_disabled(self):
+        """The action fails when the mirror is not enabled."""
+        with self.assertRaises(testing.ActionFailed):
+            self.ctx.run(self.ctx.on.action("refresh-connector-registry"), make_state(db=True, minio=True))
+
+    def test_purge_job_history_action(self):
+        """The purge-job-history action runs bounded batches and reports what it removed."""
+        state = with_execs(make_state(db=True, minio=True), testing.Exec(["psql"], stdout="1000|2500\n"))
+        self.ctx.run(
+            self.ctx.on.action(
+                "purge-job-history", params={"older-than-days": 90, "batch-size": 1000, "max-batches": 3}
+            ),
+            state,
+        )
+
+        results = self.ctx.action_results
+        self.assertEqual(results["jobs-removed"], 3000)
+        self.assertEqual(results["attempts-removed"], 7500)
+        self.assertEqual(results["batches"], 3)
+        self.assertIn("duration-seconds", results)
+
+    def test_purge_job_history_action_stops_on_partial_batch(self):
+        """Purging stops once a batch removes fewer jobs than the batch size."""
+        state = with_execs(make_state(db=True, minio=True), testing.Exec(["psql"], stdout="12|30\n"))
+        params = {"older-than-days": 90, "batch-size": 1000, "max-batches": 100}
+        self.ctx.run(self.ctx.on.action("purge-job-history", params=params), state)
+
+        self.assertEqual(self.ctx.action_results["batches"], 1)
+        self.assertEqual(self.ctx.action_results["jobs-removed"], 12)
+
+    def test_purge_job_history_action_not_ready(self):
+        """The purge-job-history action fails while the database relation is missing."""
+        state = make_state(minio=True)
+        params = {"older-than-days": 90, "batch-size": 1000, "max-batches": 100}
+        with self.assertRaises(testing.ActionFailed) as ctx:
+            self.ctx.run(self.ctx.on.action("purge-job-history", params=params), state)
+        self.assertEqual(ctx.exception.message, "charm not ready: database relation not ready")
+
+    def test_scheduled_job_history_purge(self):
+        """With job-history-retention-days set, the leader purges on update-status."""
+        state = make_state(db=True, minio=True, config={"job-history-retention-days": 180})
+        mid = self.ctx.run(self.ctx.on.pebble_ready(get_container(state, "airbyte-server")), state)
+        mid = with_checks(with_execs(mid, testing.Exec(["psql"], stdout="0|0\n")), CheckStatus.UP)
+        with self.ctx(self.ctx.on.update_status(), mid) as manager:
+            with patch("charm.purge_job_history", wraps=purge_job_history) as purge:
+                manager.run()
+        self.assertEqual(purge.call_args.kwargs["older_than_days"], 180)
+        self.assertEqual(purge.call_args.kwargs["max_batches"], JOB_HISTORY_PURGE_MAX_BATCHES)
+
+    def test_grafana_dashboards_provided(self):
+        """Both the log-based and the metrics dashboards are provided to Grafana."""
+        grafana = testing.Relation("grafana-dashboard", remote_app_name="grafana")
+        state = add_relations(make_state(), grafana)
+        out = self.ctx.run(self.ctx.on.config_changed(), state)
+
+        dashboards = json.loads(out.get_relation(grafana.id).local_app_data["dashboards"])
+        titles = {
+            json.loads(LZMABase64.decompress(template["content"]))["title"]
+            for template in dashboards["templates"].values()
+        }
+        self.assertEqual(titles, {"Airbyte", "Airbyte Metrics"})
+
+    def test_alert_rules_forwarded(self):
+        """Only the bundled Prometheus alert rules are forwarded over send-otlp."""
+        ctx = testing.Context(AirbyteK8SOperatorCharm, charm_root=pathlib.Path(__file__).parents[2])
+        otlp = testing.Relation("send-otlp", remote_app_name="otelcol")
+        state = add_relations(make_state(), otlp)
+        out = ctx.run(ctx.on.relation_changed(otlp), state)
+
+        encoded = json.loads(out.get_relation(otlp.id).local_app_data["rules"])
+        rules = lzma.decompress(base64.b64decode(encoded)).decode()
+        self.assertNotIn("AirbytePodSweeperLagging", rules)
+        self.assertIn("AirbyteJvmOldGenSaturated", rules)
+
+    def test_otlp_traces(self):
+        """Java services export traces via the OpenTelemetry agent if the collector takes them."""
+        otlp = otlp_relation(["metrics", "traces"])
+        config = {
+            "tracing-enabled": True,
+            "tracing-sample-ratio": 0.25,
+            "tracing-disabled-instrumentations": "jdbc,netty-4.1",
+        }
+        state = add_relations(make_state(db=True, minio=True, config=config), otlp)
+        out = self.ctx.run(self.ctx.on.relation_changed(otlp), state)
+
+        env = out.get_container("airbyte-server").plan.to_dict()["services"]["airbyte-server"]["environment"]
+        self.assertEqual(env["OTEL_COLLECTOR_ENDPOINT"], "http://otelcol:4318/v1/metrics")
+        self.assertEqual(env["OTEL_EXPORTER_OTLP_TRACES_ENDPOINT"], "http://otelcol:4318/v1/traces")
+        self.assertEqual(env["OTEL_SERVICE_NAME"], "airbyte-server")
+        self.assertEqual(env["OTEL_TRACES_SAMPLER_ARG"], "0.25")
+        self.assertEqual(env["OTEL_INSTRUMENTATION_JDBC_ENABLED"], "false")
+        self.assertEqual(env["OTEL_INSTRUMENTATION_NETTY_4_1_ENABLED"], "false")
+        self.assertTrue(env["JAVA_TOOL_OPTIONS"].startswith("-javaagent:/opt/opentelemetry/"))
+        sweeper_plan = out.get_container("airbyte-pod-sweeper").plan.to_dict()
+        self.assertNotIn("OTEL_TRACES_EXPORTER", sweeper_plan["services"]["airbyte-pod-sweeper"]["environment"])
+
+    def test_otlp_metrics_export_settings(self):
+        """Metrics export tuning and disabled binders are rendered per service."""
+        config = {
+            "metrics-export-overrides": "airbyte-workers.step-seconds=30",
+            "metrics-disabled-binders": "web,airbyte-workers.executor",
+        }
+        otlp = otlp_relation(["metrics"])
+        state = add_relations(make_state(db=True, minio=True, config=config), otlp)
+        out = self.ctx.run(self.ctx.on.relation_changed(otlp), state)
+
+        server_env = out.get_container("airbyte-server").plan.to_dict()["services"]["airbyte-server"]["environment"]
+        self.assertEqual(server_env["MICRONAUT_METRICS_EXPORT_OTLP_STEP"], "60s")
+        self.assertEqual(server_env["MICRONAUT_METRICS_EXPORT_OTLP_BATCH_SIZE"], 10000)
+        self.assertEqual(server_env["MICRONAUT_METRICS_BINDERS_WEB_ENABLED"], "false")
+        self.assertNotIn("MICRONAUT_METRICS_BINDERS_EXECUTOR_ENABLED", server_env)
+        workers_plan = out.get_container("airbyte-workers").plan.to_dict()
+        workers_env = workers_plan["services"]["airbyte-workers"]["environment"]
+        self.assertEqual(workers_env["MICRONAUT_METRICS_EXPORT_OTLP_STEP"], "30s")
+        self.assertEqual(workers_env["MICRONAUT_METRICS_BINDERS_EXECUTOR_ENABLED"], "false")
+
+    def test_otlp_metrics_service_name(self):
+        """Each service exports its metrics under its own service name, tracing or not."""
+        otlp = otlp_relation(["metrics"])
+        out = self.ctx.run(self.ctx.on.relation_changed(otlp), add_relations(make_state(db=True, minio=True), otlp))
+
+        for container_name in ("airbyte-server", "airbyte-workers"):
+            env = out.get_container(container_name).plan.to_dict()["services"][container_name]["environment"]
+            self.assertEqual(env["OTEL_SERVICE_NAME"], container_name)
+            self.assertIn("service.namespace=airbyte-k8s", env["OTEL_RESOURCE_ATTRIBUTES"])
+            self.assertIn("service.instance.id=airbyte-k8s/0", env["OTEL_RESOURCE_ATTRIBUTES"])
+            self.assertNotIn("JAVA_TOOL_OPTIONS", env)
+
+    def test_charm_metrics_pushed(self):
+        """The charm pushes cumulative hook, replan and API metrics to the collector."""
+        otlp = otlp_relation(["metrics"])
+        state = add_relations(make_state(db=True, minio=True), otlp)
+        out = self.ctx.run(self.ctx.on.config_changed(), state)
+        self.ctx.run(self.ctx.on.update_status(), out)
+
+        request = self.mock_urlopen.call_args.args[0]
+        self.assertEqual(request.full_url, "http://otelcol:4318/v1/metrics")
+        metrics = {
+            metric["name"]: metric
+            for metric in json.loads(request.data)["resourceMetrics"][0]["scopeMetrics"][0]["metrics"]
+        }
+        hook_points = {
+            point["attributes"][0]["value"]["stringValue"]: point
+            for point in metrics["airbyte.charm.hook.duration"]["histogram"]["dataPoints"]
+        }
+        self.assertEqual(set(hook_points), {"config-changed", "update-status"})
+        self.assertEqual(hook_points["config-changed"]["count"], "1")
+        replans = {
+            tuple(attribute["value"]["stringValue"] for attribute in point["attributes"]): point["asDouble"]
+            for point in metrics["airbyte.charm.replans"]["sum"]["dataPoints"]
+        }
+        self.assertEqual(replans[("airbyte-server", "performed")], 1)
+        self.assertIn("airbyte.charm.s3.provisioning.duration", metrics)
+        self.assertIn("airbyte.charm.k8s.api.duration", metrics)
+        self.assertIn("airbyte.charm.secret.fetches", metrics)
+
+    def test_charm_metrics_kept_without_collector(self):
+        """Without a collector nothing is pushed, but the totals are still kept."""
+        out = self.ctx.run(self.ctx.on.config_changed(), make_state(db=True, minio=True))
+
+        self.mock_urlopen.assert_not_called()
+        stored = next(stored for stored in out.stored_states if stored.owner_path == "AirbyteK8SOperatorCharm")
+        self.assertTrue(any("airbyte.charm.hook.duration" in key for key in stored.content["metrics"]))
+
+    def test_otlp_traces_not_accepted(self):
+        """No tracing is set up when the collector only accepts metrics or tracing is disabled."""
+        for telemetries, config in ((["metrics"], {"tracing-enabled": True}), (["metrics", "traces"], {})):
+            otlp = otlp_relation(telemetries)
+            state = add_relations(make_state(db=True, minio=True, config=config), otlp)
+            out = self.ctx.run(self.ctx.on.relation_changed(otlp), state)
+
+            env = out.get_container("airbyte-server").plan.to_dict()["services"]["airbyte-server"]["environment"]
+            self.assertEqual(env["OTEL_COLLECTOR_ENDPOINT"], "http://otelcol:4318/v1/metrics")
+            self.assertNotIn("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT", env)
+            self.assertNotIn("JAVA_TOOL_OPTIONS", env)
+
+
+def _up_check(status, successes=None):
     """Build the "up" CheckInfo mirroring the charm's pebble check definition.
 
     The charm's layer defines the check without a level, startup or threshold, so
@@ -346,6 +1276,7 @@ def _up_check(status):
 
     Args:
         status: the ops.pebble.CheckStatus to report for the check.
+        successes: the number of successful runs of the check, or None if not counted.
 
     Returns:
         A testing.CheckInfo for the "up" check.
@@ -356,6 +1287,7 @@ def _up_check(status):
         startup=CheckStartup.UNSET,
         threshold=None,
         status=status,
+        successes=successes,
     )
 
 
@@ -395,7 +1327,7 @@ def db_relation():
     )
 
 
-def make_state(*, config=None, leader=True, peer=True, db=False, minio=False, s3=False, containers=None):
+def make_state(*, config=None, leader=True, peer=True, migrated=True, db=False, minio=False, s3=False, containers=None):
     """Build a scenario State for the charm.
 
     The charm derives its state live from relations, so readiness is reproduced
@@ -405,6 +1337,7 @@ def make_state(*, config=None, leader=True, peer=True, db=False, minio=False, s3
         config: optional charm config overrides.
         leader: whether the unit is the leader.
         peer: whether the airbyte-peer relation is present.
+        migrated: whether the peer data records the database as migrated to this version.
         db: whether to add a ready db relation.
         minio: whether to add an object-storage (minio) relation.
         s3: whether to add a ready s3-parameters relation.
@@ -415,7 +1348,8 @@ def make_state(*, config=None, leader=True, peer=True, db=False, minio=False, s3
     """
     relations = []
     if peer:
-        relations.append(testing.PeerRelation("airbyte-peer"))
+        local_app_data = {"migrated-version": AIRBYTE_VERSION} if migrated else {}
+        relations.append(testing.PeerRelation("airbyte-peer", local_app_data=local_app_data))
     if db:
         relations.append(db_relation())
     if minio:
@@ -432,6 +1366,21 @@ def make_state(*, config=None, leader=True, peer=True, db=False, minio=False, s3
     )
 
 
+def otlp_relation(telemetries):
+    """Build a send-otlp relation whose collector offers an OTLP/HTTP endpoint.
+
+    Args:
+        telemetries: the signals the collector accepts.
+
+    Returns:
+        A testing.Relation for send-otlp.
+    """
+    endpoint = {"protocol": "http", "endpoint": "http://otelcol:4318", "telemetries": telemetries, "insecure": True}
+    return testing.Relation(
+        "send-otlp", remote_app_name="otelcol", remote_app_data={"endpoints": json.dumps([endpoint])}
+    )
+
+
 def add_relations(state, *relations):
     """Return a copy of the state with extra relations added.
 
@@ -445,6 +1394,22 @@ def add_relations(state, *relations):
     return dataclasses.replace(state, relations=set(state.relations) | set(relations))
 
 
+def replace_container(state, container_name, **changes):
+    """Return a copy of the state with one container's fields replaced.
+
+    Args:
+        state: the testing.State to copy.
+        container_name: name of the container to change.
+        changes: the testing.Container fields to replace.
+
+    Returns:
+        A new testing.State including the changed container.
+    """
+    container = get_container(state, container_name)
+    containers = set(state.containers) - {container} | {dataclasses.replace(container, **changes)}
+    return dataclasses.replace(state, containers=containers)
+
+
 def s3_provider_databag():
     """Create and return mock s3 credentials.
 
@@ -462,6 +1427,24 @@ def s3_provider_databag():
     }
 
 
+def with_execs(state, *execs):
+    """Return a copy of the state where the airbyte-server container mocks the given commands.
+
+    Args:
+        state: the testing.State to copy.
+        execs: testing.Exec mocks to add to the airbyte-server container.
+
+    Returns:
+        A new testing.State with the updated container.
+    """
+    containers = set()
+    for container in state.containers:
+        if container.name == "airbyte-server":
+            container = dataclasses.replace(container, execs=frozenset(execs))
+        containers.add(container)
+    return dataclasses.replace(state, containers=containers)
+
+
 def get_container(state, name):
     """Return the container with the given name from a state.
 
@@ -525,7 +1508,7 @@ def create_plan(container_name, storage_type):
                     "DATABASE_HOST": "myhost",
                     "DATABASE_PASSWORD": "inner-light",  # nosec
                     "DATABASE_PORT": "5432",
-                    "DATABASE_URL": "jdbc:postgresql://myhost:5432/airbyte-k8s_db",
+                    "DATABASE_URL": PRIMARY_DATABASE_URL,
                     "DATABASE_USER": "jean-luc@db",
                     "DATAPLANE_CLIENT_ID": "sample-client-id",
                     "DATAPLANE_CLIENT_SECRET": "sample-client-secret",
@@ -535,7 +1518,10 @@ def create_plan(container_name, storage_type):
                     "JOB_KUBE_NAMESPACE": "airbyte-model",
                     "JOB_KUBE_SERVICEACCOUNT": "airbyte-k8s",
                     "JOB_KUBE_SIDECAR_CONTAINER_IMAGE_PULL_POLICY": "IfNotPresent",
-                    "KEYCLOAK_DATABASE_URL": "jdbc:postgresql://myhost:5432/airbyte-k8s_db?currentSchema=keycloak",
+                    "KEYCLOAK_DATABASE_URL": (
+                        "jdbc:postgresql://myhost:5432,anotherhost:2345/airbyte-k8s_db"
+                        "?targetServerType=primary&currentSchema=keycloak"
+                    ),
                     "KEYCLOAK_INTERNAL_HOST": "localhost",
                     "LOG_LEVEL": "INFO",
                     "MAX_CHECK_WORKERS": 5,
@@ -546,8 +1532,14 @@ def create_plan(container_name, storage_type):
                     "MAX_SPEC_WORKERS": 5,
                     "MAX_SYNC_WORKERS": 5,
                     "RUNNING_TTL_MINUTES": 240,
+                    "RUN_DATABASE_MIGRATION_ON_STARTUP": str(container_name == "airbyte-bootloader").lower(),
                     "S3_LOG_BUCKET": "airbyte-dev-logs",
+                    "SHOULD_RUN_CHECK_CONNECTION_WORKFLOWS": "true",
+                    "SHOULD_RUN_CONNECTION_MANAGER_WORKFLOWS": "true",
+                    "SHOULD_RUN_DISCOVER_WORKFLOWS": "true",
+                    "SHOULD_RUN_GET_SPEC_WORKFLOWS": "true",
                     "SHOULD_RUN_NOTIFY_WORKFLOWS": "true",
+                    "SHOULD_RUN_SYNC_WORKFLOWS": "true",
                     "STORAGE_BUCKET_ACTIVITY_PAYLOAD": "airbyte-payload-storage",
                     "STORAGE_BUCKET_LOG": "airbyte-dev-logs",
                     "STORAGE_BUCKET_STATE": "airbyte-state-storage",
@@ -579,13 +1571,34 @@ def create_plan(container_name, storage_type):
     }
 
     if container_name == "airbyte-bootloader":
-        want_plan["services"][container_name].update({"on-success": "ignore"})
+        want_plan["services"][container_name].update(
+            {
+                "command": (
+                    "/bin/bash -c '/bin/bash airbyte-bootloader/airbyte-app/bin/airbyte-bootloader"
+                    " && (/charm/bin/pebble notify airbyte.io/bootloader-completed || true)'"
+                ),
+                "on-success": "ignore",
+            }
+        )
+
+    if container_name in ["airbyte-workload-launcher", "airbyte-workers"]:
+        want_plan["services"][container_name]["kill-delay"] = "20s"
 
     if container_name in ["airbyte-workload-launcher", "airbyte-workers", "airbyte-cron"]:
         want_plan["services"][container_name]["environment"].update(
             {"INTERNAL_API_HOST": "http://airbyte-k8s:8001", "WORKLOAD_API_HOST": "http://airbyte-k8s:8007"}
         )
 
+    if container_name in DATABASE_POOL_CONTAINERS:
+        for datasource in ("CONFIG", "JOBS"):
+            want_plan["services"][container_name]["environment"].update(
+                {
+                    f"DATASOURCES_{datasource}_MAXIMUM_POOL_SIZE": 10,
+                    f"DATASOURCES_{datasource}_MINIMUM_IDLE": 0,
+                    f"DATASOURCES_{datasource}_CONNECTION_TIMEOUT": 30000,
+                }
+            )
+
     if storage_type == StorageType.minio:
         want_plan["services"][container_name]["environment"].update(
             {
@@ -34,6 +34,11 @@ class TestCharmStructuredConfig(TestCase):
         self.mock_k8s_api = patcher2.start()
         self.addCleanup(patcher1.stop)
         self.addCleanup(patcher2.stop)
+        patcher3 = patch("kubernetes.client.AppsV1Api")
+        self.mock_k8s_apps_api = patcher3.start()
+        self.addCleanup(patcher3.stop)
+        self.mock_apps_v1_instance = MagicMock()
+        self.mock_k8s_apps_api.return_value = self.mock_apps_v1_instance
         self.mock_core_v1_instance = MagicMock()
         self.mock_k8s_api.return_value = self.mock_core_v1_instance
 
@@ -91,6 +96,15 @@ class TestCharmStructuredConfig(TestCase):
             "pod-running-ttl-minutes",
             "pod-successful-ttl-minutes",
             "pod-unsuccessful-ttl-minutes",
+            "job-history-retention-days",
+            "job-history-purge-batch-size",
+            "metrics-export-step-seconds",
+            "metrics-export-batch-size",
+            "temporal-worker-port-start",
+            "temporal-worker-port-count",
+            "startup-concurrency",
+            "rolling-restart-max-units",
+            "drain-timeout",
         ]
         erroneus_values = [-5]
         valid_values = [42, 100, 1]
@@ -98,6 +112,86 @@ class TestCharmStructuredConfig(TestCase):
             self.check_invalid_values(field, erroneus_values)
             self.check_valid_values(field, valid_values)
 
+    def test_database_pool_overrides_values(self) -> None:
+        """Test specific parameters for the database-pool-overrides field."""
+        erroneus_values = [
+            "airbyte-server=20",
+            "airbyte-ui.max-size=5",
+            "airbyte-cron.pool=3",
+            "airbyte-cron.min-idle=-1",
+            "airbyte-server.max-size=0",
+            "airbyte-workers.connection-timeout-ms=0",
+            "airbyte-server.max-size=big",
+            "airbyte-server.max-size=",
+        ]
+        self.check_invalid_values("database-pool-overrides", erroneus_values)
+        accepted_values = [
+            "airbyte-server.max-size=20",
+            "airbyte-cron.min-idle=1,airbyte-workers.connection-timeout-ms=5000",
+            "airbyte-cron.min-idle=0",
+            "airbyte-server.max-size=20,",
+        ]
+        self.check_valid_values("database-pool-overrides", accepted_values)
+
+    def test_database_pooler_values(self) -> None:
+        """Test specific parameters for the database-pooler-* fields."""
+        self.check_invalid_values("database-pooler-endpoint", ["pgbouncer", ":6432", "pgbouncer:0"])
+        self.check_valid_values("database-pooler-endpoint", ["pgbouncer:6432"])
+        self.check_invalid_values("database-pooler-services", ["airbyte-bootloader", "airbyte-server,airbyte-ui"])
+        self.check_valid_values("database-pooler-services", ["airbyte-server", "airbyte-cron,airbyte-workers"])
+
+    def test_log_settings_values(self) -> None:
+        """Test specific parameters for the per-service and per-logger log fields."""
+        self.check_invalid_values("log-level-overrides", ["airbyte-ui=DEBUG", "airbyte-server=TRACE"])
+        self.check_valid_values("log-level-overrides", ["airbyte-workload-launcher=DEBUG,airbyte-cron=WARNING"])
+        self.check_invalid_values("log-logger-levels", ["io..temporal=INFO", "io.temporal=WARN"])
+        self.check_valid_values("log-logger-levels", ["io.temporal=WARNING,io.airbyte.workers=DEBUG"])
+        self.check_invalid_values("log-rate-limits", ["io.temporal=0", "io.temporal=fast"])
+        self.check_valid_values("log-rate-limits", ["io.temporal.internal.worker=5"])
+
+    def test_metrics_export_values(self) -> None:
+        """Test specific parameters for the metrics export fields."""
+        self.check_invalid_values(
+            "metrics-export-overrides",
+            ["airbyte-server=30", "airbyte-pod-sweeper.step-seconds=30", "airbyte-server.step-seconds=0"],
+        )
+        self.check_valid_values(
+            "metrics-export-overrides", ["airbyte-workers.step-seconds=30,airbyte-server.batch-size=2000"]
+        )
+        self.check_invalid_values("metrics-disabled-binders", ["http", "airbyte-ui.web"])
+        self.check_valid_values("metrics-disabled-binders", ["web", "jdbc,airbyte-workers.executor"])
+
+    def test_worker_task_queues_values(self) -> None:
+        """Test specific parameters for the worker task queue fields."""
+        self.check_invalid_values("worker-task-queues", ["default", "sync,jobs", "sync", "spec,check,discover"])
+        self.check_valid_values("worker-task-queues", ["notify,connection-manager,sync,discover,check,spec"])
+        self.check_invalid_values("worker-task-queue-overrides", ["sync", "a=sync", "0=sync+jobs"])
+        self.check_valid_values("worker-task-queue-overrides", ["0=sync", "0=connection-manager+notify,1=sync+check"])
+
+    def test_worker_task_queues_coverage(self) -> None:
+        """Every task queue is polled by `worker-task-queues` or an override."""
+        for overrides, valid in (
+            ("0=spec+check+discover,1=connection-manager+notify", True),
+            ("0=spec+check+discover", False),
+        ):
+            state = testing.State(
+                leader=True,
+                config={"worker-task-queues": "sync", "worker-task-queue-overrides": overrides},
+                model=testing.Model(name="airbyte-model"),
+                containers=self.containers,
+            )
+            with self.ctx(self.ctx.on.config_changed(), state) as manager:
+                if valid:
+                    self.assertEqual(manager.charm.config["worker-task-queue-overrides"], overrides)
+                else:
+                    with self.assertRaises(ValueError):
+                        _ = manager.charm.config["worker-task-queues"]
+
+    def test_tracing_sample_ratio_values(self) -> None:
+        """Test specific parameters for the tracing-sample-ratio field."""
+        self.check_invalid_values("tracing-sample-ratio", [-0.1, 1.5])
+        self.check_valid_values("tracing-sample-ratio", [0.0, 0.1, 1.0])
+
     def test_application_related_values(self) -> None:
         """Test specific parameters for application-related fields."""
         erroneus_values = ["test-value", "foo", "bar"]